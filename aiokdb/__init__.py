@@ -1,17 +1,41 @@
 import array
+import collections
 import enum
+import functools
 import logging
+import operator
 import struct
+import sys
 import uuid
 from collections.abc import MutableSequence
-from typing import Any, Dict, List, Tuple, Type, Union, cast
-
-from aiokdb.adapter import BoolByteAdaptor, SymIntAdaptor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    cast,
+    overload,
+)
+
+from aiokdb.adapter import (
+    BoolByteAdaptor,
+    CharBytesAdaptor,
+    LazyKObjAdaptor,
+    SymIntAdaptor,
+    UUIDBytesAdaptor,
+)
 from aiokdb.compress import decompress
 from aiokdb.context import KContext
 
 __all__ = [
     "b9",
+    "b9_chunks",
     "d9",
     "ktn",
     "kk",
@@ -34,6 +58,7 @@ __all__ = [
     "ks",
     "kuu",
     "KContext",
+    "TableRow",
 ]
 
 # mypy: disallow-untyped-defs
@@ -131,6 +156,111 @@ ATOM_LENGTH: Dict[int, int] = {
 
 DEFAULT_CONTEXT = KContext()
 
+# d9 decodes from any contiguous buffer that supports index() for null terminators
+BytesLike = Union[bytes, bytearray]
+
+# decodes the object whose type byte precedes offset, returning it and the next offset,
+# symbols being interned in the given context
+_Decoder = Callable[[BytesLike, int, KContext], Tuple["KObj", int]]
+
+# precompiled framing for the 8 byte message header and the 6 byte vector header
+_HEADER = struct.Struct("<BBHI")
+_VECTOR_HEADER = struct.Struct("<bBI")
+_VECTOR_ATTR_LEN = struct.Struct("<BI")
+_TYPE = struct.Struct("<b")
+_INT = struct.Struct("<i")
+
+# IPC data is little endian, arrays hold native order
+_BYTESWAP = sys.byteorder == "big"
+assert array.array("i").itemsize == 4, "int vectors require a 32 bit array typecode"
+
+
+def _split_symbols(data: BytesLike, offset: int, sz: int) -> List[bytes]:
+    # split sz null terminated symbols in one pass. The extent of the region is not
+    # known up front, so split a window of the buffer, growing it until it holds
+    # sz terminators
+    if sz == 0:
+        return []
+    window = 8 * sz + 64
+    while True:
+        stop = offset + window
+        parts = bytes(memoryview(data)[offset:stop]).split(b"\x00", sz)
+        if len(parts) > sz:
+            parts.pop()  # remainder of the window beyond the last terminator
+            return parts
+        if stop >= len(data):
+            raise ValueError(f"symbol vector of {sz} missing terminators")
+        window *= 4
+
+
+def _array_frombytes(
+    typecode: str, data: BytesLike, offset: int, nbytes: int
+) -> "array.array[Any]":
+    # copy straight from the receive buffer into the array storage, slicing through a
+    # memoryview avoids an intermediate bytes object per vector
+    a = array.array(typecode)
+    a.frombytes(memoryview(data)[offset : offset + nbytes])
+    if _BYTESWAP:
+        a.byteswap()
+    return a
+
+
+# vectors at least this many bytes are passed by reference when streaming
+_STREAM_THRESHOLD = 65536
+
+
+class _ChunkedBuffer(bytearray):
+    # encode sink for b9_chunks: framing and small vectors accumulate in the
+    # bytearray itself, large vector storage is passed through as a memoryview
+    # after flushing what came before it
+    def __init__(self) -> None:
+        super().__init__()
+        self.chunks: List[Union[bytes, memoryview]] = []
+        self.flushed = 0
+
+    def put(self, data: Union[bytes, memoryview]) -> None:
+        if len(self):
+            self.chunks.append(bytes(self))
+            self.flushed += len(self)
+            del self[:]
+        self.chunks.append(data)
+        self.flushed += len(data)
+
+    def finish(self) -> List[Union[bytes, memoryview]]:
+        if len(self):
+            self.chunks.append(bytes(self))
+            self.flushed += len(self)
+            del self[:]
+        return self.chunks
+
+
+def _same_bits(a: "array.array[Any]", b: "array.array[Any]") -> bool:
+    # compare float storage as integers of the same width, so that NaNs are equal
+    # as they would be once encoded
+    if len(a) != len(b):
+        return False
+    if a.itemsize == 8:
+        return memoryview(a).cast("B").cast("q") == memoryview(b).cast("B").cast("q")
+    return memoryview(a).cast("B").cast("i") == memoryview(b).cast("B").cast("i")
+
+
+def _put_array(buf: bytearray, a: "array.array[Any]") -> None:
+    # append array storage as little endian wire data, a single buffer copy
+    if _BYTESWAP:
+        a = array.array(a.typecode, a)
+        a.byteswap()
+    _put_bytes(buf, a)
+
+
+def _put_bytes(buf: bytearray, data: Any) -> None:
+    # append any buffer, by reference if streaming and large enough to be worth it
+    if type(buf) is _ChunkedBuffer:
+        view = memoryview(data).cast("B")
+        if len(view) >= _STREAM_THRESHOLD:
+            buf.put(view)
+            return
+    buf += data
+
 
 def tn(t: int) -> str:
     te = t
@@ -142,6 +272,8 @@ def tn(t: int) -> str:
 
 
 class KObj:
+    __slots__ = ("t", "attrib", "context", "_hash")
+
     def __init__(
         self,
         t: int = 0,
@@ -152,12 +284,19 @@ class KObj:
         self.t = t
         self.attrib = attr
         self.context: KContext = context
+        self._hash: Optional[int] = None
 
     def _paysz(self) -> int:
-        return 1
+        return len(self._databytes())
 
     def _databytes(self) -> bytes:
-        return struct.pack("<b", self.t)
+        buf = bytearray()
+        self._encode(buf)
+        return bytes(buf)
+
+    def _encode(self, buf: bytearray) -> None:
+        # serialise by appending to a shared buffer, subclasses extend
+        buf.append(self.t & 0xFF)
 
     def _tn(self) -> str:
         return tn(self.t)
@@ -258,7 +397,7 @@ class KObj:
     def kF(self) -> "MutableSequence[float]":
         raise self._te()
 
-    def kC(self) -> array.array:  # type: ignore[type-arg]
+    def kC(self) -> CharBytesAdaptor:
         raise self._te()
 
     def kS(self) -> "MutableSequence[str]":
@@ -280,14 +419,36 @@ class KObj:
         raise self._te()
 
     # deserialise content from stream
-    def frombytes(self, data: bytes, offset: int) -> Tuple["KObj", int]:
+    def frombytes(self, data: BytesLike, offset: int) -> Tuple["KObj", int]:
         raise self._te()
 
     def __eq__(self, other: Any) -> bool:
-        # this could be optimised in subclasses with appropriate descent logic
-        if isinstance(other, KObj):
+        # equal when b9() would encode both the same, without encoding them
+        if self is other:
+            return True
+        if not isinstance(other, KObj):
+            return NotImplemented
+        if self.t != other.t or self.attrib != other.attrib:
+            return False
+        if type(self) is not type(other) and type(self)._eq is not type(other)._eq:
             return b9(self) == b9(other)
-        return NotImplemented
+        return self._eq(other)
+
+    def _eq(self, other: Any) -> bool:
+        # compare content with other, of the same type, attribute and class
+        return b9(self) == b9(other)
+
+    def __hash__(self) -> int:
+        # hashes the encoding, so is as costly as b9() unless cached
+        if self._hash is not None:
+            return self._hash
+        return hash(b9(self))
+
+    def cache_hash(self) -> int:
+        # keep the hash once computed, for objects no longer modified such as
+        # dict and cache keys. Modifying the object afterwards breaks lookups
+        self._hash = hash(b9(self))
+        return self._hash
 
     def __repr__(self) -> str:
         raise self._te()
@@ -300,6 +461,8 @@ class KObj:
 # constructors always take type t, optional context, and
 # optionally a size, attr pair
 class KObjAtom(KObj):
+    __slots__ = ("data",)
+
     def __init__(
         self,
         t: int = 0,
@@ -312,6 +475,9 @@ class KObjAtom(KObj):
         super().__init__(t, context)
         self.data: bytes = b"\x00" * ATOM_LENGTH[-self.t]
 
+    def _eq(self, other: Any) -> bool:
+        return bool(self.data == other.data)
+
     # atom setters
     def b(self, b: bool) -> KObj:
         if self.t not in [-TypeEnum.KB]:
@@ -421,16 +587,14 @@ class KObjAtom(KObj):
         return self.data.decode("utf-8")
 
     # serialisation
-    def _databytes(self) -> bytes:
-        return super()._databytes() + self.data
-
-    def _paysz(self) -> int:
+    def _encode(self, buf: bytearray) -> None:
         assert len(self.data) == ATOM_LENGTH[-self.t]
-        return super()._paysz() + ATOM_LENGTH[-self.t]
+        buf.append(self.t & 0xFF)
+        buf += self.data
 
-    def frombytes(self, data: bytes, offset: int) -> Tuple[KObj, int]:
+    def frombytes(self, data: BytesLike, offset: int) -> Tuple[KObj, int]:
         bs = ATOM_LENGTH[-self.t]
-        self.data = data[offset : offset + bs]
+        self.data = bytes(data[offset : offset + bs])
         return self, offset + bs
 
     def __repr__(self) -> str:
@@ -460,7 +624,80 @@ class KObjAtom(KObj):
             raise Exception(f"__repr__ NYI for t={self.t}")
 
 
+class KFrozenAtom(KObjAtom):
+    # immutable atom, a single instance of each common value is shared by decoding
+    __slots__ = ()
+
+    def _immutable(self) -> Exception:
+        return WrongTypeForOperationError(f"shared {self._tn()} atom is immutable")
+
+    def b(self, b: bool) -> KObj:
+        raise self._immutable()
+
+    def c(self, c: str) -> KObj:
+        raise self._immutable()
+
+    def f(self, f: float) -> KObj:
+        raise self._immutable()
+
+    def g(self, g: int) -> KObj:
+        raise self._immutable()
+
+    def h(self, h: int) -> KObj:
+        raise self._immutable()
+
+    def i(self, i: int) -> KObj:
+        raise self._immutable()
+
+    def j(self, j: int) -> KObj:
+        raise self._immutable()
+
+    def uu(self, uu: uuid.UUID) -> KObj:
+        raise self._immutable()
+
+
+def _frozen_atom(t: int, data: bytes) -> KFrozenAtom:
+    atom = KFrozenAtom(t)
+    atom.data = data
+    return atom
+
+
+# flyweights by type then wire bytes: nil, booleans, bytes and small integers
+_ATOM_FLYWEIGHTS: Dict[int, Dict[bytes, KObj]] = {
+    TypeEnum.NIL: {b"\x00": _frozen_atom(TypeEnum.NIL, b"\x00")}
+}
+for _t, _fmt, _values in (
+    (-TypeEnum.KB, "<B", range(2)),
+    (-TypeEnum.KG, "<B", range(256)),
+    (-TypeEnum.KH, "<h", range(-1, 256)),
+    (-TypeEnum.KI, "<i", range(-1, 256)),
+    (-TypeEnum.KJ, "<q", range(-1, 256)),
+):
+    _ATOM_FLYWEIGHTS[_t] = {
+        struct.pack(_fmt, v): _frozen_atom(_t, struct.pack(_fmt, v)) for v in _values
+    }
+
+
+def _d9_atom_decoder(t: int) -> "_Decoder":
+    # decoder for one atom type, closing over its width and shared instances
+    width = ATOM_LENGTH[-t]
+    flyweights = _ATOM_FLYWEIGHTS.get(t, {})
+
+    def decode(data: BytesLike, offset: int, context: KContext) -> Tuple[KObj, int]:
+        end = offset + width
+        raw = bytes(data[offset:end])
+        atom = flyweights.get(raw)
+        if atom is None:
+            atom = KObjAtom(t)
+            atom.data = raw
+        return atom, end
+
+    return decode
+
+
 class KSymAtom(KObj):
+    __slots__ = ("data",)
+
     def __init__(
         self,
         t: int = 0,
@@ -471,6 +708,12 @@ class KSymAtom(KObj):
         super().__init__(t, context)
         self.data: bytes = b""
 
+    def _eq(self, other: Any) -> bool:
+        if self.context is other.context:
+            return bool(self.data == other.data)
+        theirs = other.context.lookup_bytes(other.aI())
+        return bool(self.context.lookup_bytes(self.aI()) == theirs)
+
     def aI(self) -> int:
         return cast(int, struct.unpack("i", self.data)[0])
 
@@ -484,16 +727,14 @@ class KSymAtom(KObj):
         return self
 
     # serialisation
-    def _databytes(self) -> bytes:
-        return super()._databytes() + self.context.lookup_bytes(self.aI())
+    def _encode(self, buf: bytearray) -> None:
+        buf.append(self.t & 0xFF)
+        buf += self.context.lookup_bytes(self.aI())
 
-    def _paysz(self) -> int:
-        return super()._paysz() + len(self.context.lookup_bytes(self.aI()))
-
-    def frombytes(self, data: bytes, offset: int) -> Tuple[KObj, int]:
-        bs = data[offset:].index(b"\x00") + 1
-        self.ss(data[offset : offset + bs - 1].decode("utf-8"))
-        return self, offset + bs
+    def frombytes(self, data: BytesLike, offset: int) -> Tuple[KObj, int]:
+        end = data.index(b"\x00", offset)
+        self.data = struct.pack("i", self.context.ss_bytes(bytes(data[offset:end])))
+        return self, end + 1
 
     def __repr__(self) -> str:
         if self.t == TypeEnum.KRR:
@@ -502,6 +743,8 @@ class KSymAtom(KObj):
 
 
 class KFnAtom(KObj):
+    __slots__ = ("prelude", "data")
+
     def __init__(
         self,
         context: KContext = DEFAULT_CONTEXT,
@@ -512,6 +755,9 @@ class KFnAtom(KObj):
         self.prelude: bytes = prelude
         self.data: bytes = data
 
+    def _eq(self, other: Any) -> bool:
+        return bool(self.prelude == other.prelude and self.data == other.data)
+
     def aS(self) -> str:
         return self.data.decode("ascii")
 
@@ -523,30 +769,27 @@ class KFnAtom(KObj):
         return f"KFnAtom(prelude={repr(self.prelude)}, data={repr(self.data)})"
 
     # serialisation
-    def _databytes(self) -> bytes:
-        return (
-            super()._databytes()
-            + self.prelude
-            + struct.pack("i", len(self.data))
-            + self.data
-        )
+    def _encode(self, buf: bytearray) -> None:
+        buf.append(self.t & 0xFF)
+        buf += self.prelude
+        buf += struct.pack("<i", len(self.data))
+        buf += self.data
 
-    def _paysz(self) -> int:
-        return super()._paysz() + len(self.data) + 4 + len(self.prelude)
-
-    def frombytes(self, data: bytes, offset: int) -> Tuple[KObj, int]:
+    def frombytes(self, data: BytesLike, offset: int) -> Tuple[KObj, int]:
         # guesswork: k lambdas use a 4 byte prelude, q 3 bytes
         prelude_len = {0: 3, 104: 4, 113: 4}[data[offset]]
 
-        sz = struct.unpack("i", data[offset + prelude_len : offset + prelude_len + 4])[
-            0
-        ]
-        self.prelude = data[offset : offset + prelude_len]
-        self.data = data[offset + prelude_len + 4 : offset + prelude_len + 4 + sz]
+        (sz,) = _INT.unpack_from(data, offset + prelude_len)
+        self.prelude = bytes(data[offset : offset + prelude_len])
+        self.data = bytes(
+            data[offset + prelude_len + 4 : offset + prelude_len + 4 + sz]
+        )
         return self, offset + len(self.prelude) + 4 + len(self.data)
 
 
 class KOpAtom(KObj):
+    __slots__ = ("op",)
+
     def __init__(
         self,
         context: KContext = DEFAULT_CONTEXT,
@@ -554,44 +797,58 @@ class KOpAtom(KObj):
         super().__init__(TypeEnum.OP, context)
         self.op: int = 0
 
+    def _eq(self, other: Any) -> bool:
+        return bool(self.op == other.op)
+
     def aJ(self) -> int:
         return self.op
 
     # serialisation
-    def _databytes(self) -> bytes:
-        return super()._databytes() + struct.pack("<b", self.op)
-
-    def _paysz(self) -> int:
-        return super()._paysz() + 1
+    def _encode(self, buf: bytearray) -> None:
+        buf.append(self.t & 0xFF)
+        buf.append(self.op & 0xFF)
 
-    def frombytes(self, data: bytes, offset: int) -> Tuple[KObj, int]:
+    def frombytes(self, data: BytesLike, offset: int) -> Tuple[KObj, int]:
         self.op = data[offset]
         return self, offset + 1
 
 
 class KRangedType(KObj):
-    def frombytes(self, data: bytes, offset: int) -> Tuple[KObj, int]:
-        attrib, sz = struct.unpack_from("<BI", data, offset=offset)
+    __slots__ = ("_version",)
+
+    def __init__(
+        self,
+        t: int = 0,
+        context: KContext = DEFAULT_CONTEXT,
+        sz: int = 0,
+        attr: int = 0,
+    ) -> None:
+        super().__init__(t, context, sz, attr)
+        # bumped by each accessor handing out the mutable storage, so that
+        # indexes of the values, such as KDict's, know to rebuild
+        self._version = 0
+
+    def frombytes(self, data: BytesLike, offset: int) -> Tuple[KObj, int]:
+        attrib, sz = _VECTOR_ATTR_LEN.unpack_from(data, offset)
         self.attrib = attrib
-        logger.debug(f" frombytes for ranged type attrib={attrib} sz={sz}")
         return self._ranged_frombytes(sz, data, offset + 5)
 
-    def _ranged_frombytes(self, sz: int, data: bytes, offset: int) -> Tuple[KObj, int]:
+    def _ranged_frombytes(
+        self, sz: int, data: BytesLike, offset: int
+    ) -> Tuple[KObj, int]:
         raise self._te()
 
 
 class KByteArray(KRangedType):
+    __slots__ = ("_g",)
+
     def __init__(self, t: int = TypeEnum.KG, sz: int = 0, attr: int = 0) -> None:
         super().__init__(t, attr=attr)
-        self._g = array.array("B", [0] * sz)
+        self._g = array.array("B", bytes(sz))
 
-    def _paysz(self) -> int:
-        return 2 + 4 + 1 * len(self._g)
-
-    def _databytes(self) -> bytes:
-        return struct.pack("<bBI", self.t, self.attrib, len(self._g)) + struct.pack(
-            f"<{len(self._g)}B", *self._g
-        )
+    def _encode(self, buf: bytearray) -> None:
+        buf += _VECTOR_HEADER.pack(self.t, self.attrib, len(self._g))
+        _put_array(buf, self._g)
 
     def __repr__(self) -> str:
         if self.t == TypeEnum.KB:
@@ -604,368 +861,663 @@ class KByteArray(KRangedType):
             return super().__repr__()
 
     def kG(self) -> "MutableSequence[int]":
+        self._version += 1
         return self._g
 
     def kB(self) -> "MutableSequence[bool]":
+        self._version += 1
         return BoolByteAdaptor(self._g)
 
     def __len__(self) -> int:
         return len(self._g)
 
-    def _ranged_frombytes(self, sz: int, data: bytes, offset: int) -> Tuple[KObj, int]:
-        self._g = array.array("B", data[offset : offset + sz])
+    def _eq(self, other: Any) -> bool:
+        return bool(self._g == other._g)
+
+    def _ranged_frombytes(
+        self, sz: int, data: BytesLike, offset: int
+    ) -> Tuple[KObj, int]:
+        self._g = _array_frombytes("B", data, offset, sz)
         return self, offset + sz
 
 
 class KShortArray(KRangedType):
+    __slots__ = ("_h",)
+
     def __init__(self, t: int = TypeEnum.KH, sz: int = 0, attr: int = 0) -> None:
         super().__init__(t, attr=attr)
-        self._h = array.array("h", [0] * sz)
+        self._h = array.array("h", bytes(2 * sz))
 
-    def _paysz(self) -> int:
-        return 2 + 4 + 2 * len(self._h)
-
-    def _databytes(self) -> bytes:
-        return struct.pack("<bBI", self.t, self.attrib, len(self._h)) + struct.pack(
-            f"<{len(self._h)}H", *self._h
-        )
+    def _encode(self, buf: bytearray) -> None:
+        buf += _VECTOR_HEADER.pack(self.t, self.attrib, len(self._h))
+        _put_array(buf, self._h)
 
     def __repr__(self) -> str:
         parts = ", ".join(repr(r) for r in self.kH())
         return f"ktni({self._te_repr()}, {parts})"
 
     def kH(self) -> "MutableSequence[int]":
+        self._version += 1
         return self._h
 
     def __len__(self) -> int:
         return len(self._h)
 
-    def _ranged_frombytes(self, sz: int, data: bytes, offset: int) -> Tuple[KObj, int]:
-        self._h = array.array("h", data[offset : offset + 2 * sz])
+    def _eq(self, other: Any) -> bool:
+        return bool(self._h == other._h)
+
+    def _ranged_frombytes(
+        self, sz: int, data: BytesLike, offset: int
+    ) -> Tuple[KObj, int]:
+        self._h = _array_frombytes("h", data, offset, 2 * sz)
         return self, offset + 2 * sz
 
 
 class KIntArray(KRangedType):
-    # python doesn't have a reliable 32-bit array type, "l" can either be 32 or 64 bits
-    # which breaks direct cast-style deserialising. So when l is 64 bits we need to
-    # iteratively unpack with unpack_from. Somewhat annoying given the other types map
-    # cleanly.
+    # "l" can be either 32 or 64 bits, whereas "i" is 32 bits on every platform
+    # CPython supports, so the storage maps directly onto the wire format
+    __slots__ = ("_i",)
+
     def __init__(self, t: int = TypeEnum.KI, sz: int = 0, attr: int = 0) -> None:
         super().__init__(t, attr=attr)
-        self._i = array.array("l", [0] * sz)
+        self._i = array.array("i", bytes(4 * sz))
 
-    def _paysz(self) -> int:
-        return 2 + 4 + 4 * len(self._i)
-
-    def _databytes(self) -> bytes:
-        if self._i.itemsize == 4:  # array type 'l' seems to store as 8 bytes
-            pi = self._i.tobytes()
-        else:
-            pi = struct.pack(f"<{len(self._i)}I", *self._i)
-        return struct.pack("<bBI", self.t, self.attrib, len(self._i)) + pi
+    def _encode(self, buf: bytearray) -> None:
+        buf += _VECTOR_HEADER.pack(self.t, self.attrib, len(self._i))
+        _put_array(buf, self._i)
 
     def __repr__(self) -> str:
         parts = ", ".join(repr(r) for r in self.kI())
         return f"ktni({self._te_repr()}, {parts})"
 
     def kI(self) -> "MutableSequence[int]":
+        self._version += 1
         return self._i
 
     def __len__(self) -> int:
         return len(self._i)
 
-    def _ranged_frombytes(self, sz: int, data: bytes, offset: int) -> Tuple[KObj, int]:
-        o2 = offset + 4 * sz
-        if self._i.itemsize == 4:
-            self._i = array.array("l", data[offset:o2])
-        else:
-            self._i = array.array("l", [0] * sz)
-            for i in range(sz):
-                self._i[i] = struct.unpack_from("<l", data, offset + 4 * i)[0]
-        return self, o2
+    def _eq(self, other: Any) -> bool:
+        return bool(self._i == other._i)
+
+    def _ranged_frombytes(
+        self, sz: int, data: BytesLike, offset: int
+    ) -> Tuple[KObj, int]:
+        self._i = _array_frombytes("i", data, offset, 4 * sz)
+        return self, offset + 4 * sz
 
 
 class KIntSymArray(KIntArray):
     # store symbol indexes in KIntArray
     # hook serialise to use null byte terminated representation
-    def _paysz(self) -> int:
-        return 2 + 4 + sum([len(self.context.lookup_bytes(j)) for j in self._i])
+    __slots__ = ()
 
-    def _databytes(self) -> bytes:
-        parts = [struct.pack("<bBI", self.t, self.attrib, len(self._i))]
-        for j in self._i:
-            parts.append(self.context.lookup_bytes(j))
-        return b"".join(parts)
+    def _encode(self, buf: bytearray) -> None:
+        buf += _VECTOR_HEADER.pack(self.t, self.attrib, len(self._i))
+        _put_bytes(buf, self.context.lookup_bytes_many(self._i))
 
     def __repr__(self) -> str:
         strs = ", ".join(repr(s) for s in self.kS())
         return f"ktns({strs})"
 
     def kS(self) -> "MutableSequence[str]":
+        self._version += 1
         return SymIntAdaptor(self._i, self.context)
 
     def appendS(self, *ss: str) -> KObj:
-        for s in ss:
-            j = self.context.ss(s)
-            self._i.append(j)
+        self._version += 1
+        self._i.extend(self.context.ss_many(ss))
         return self
 
     def __len__(self) -> int:
         return len(self._i)
 
-    def _ranged_frombytes(self, sz: int, data: bytes, offset: int) -> Tuple[KObj, int]:
-        self._i = array.array("l", [0] * sz)
-        for i in range(sz):
-            bs = data.index(b"\x00", offset) - offset
-            s = data[offset : offset + bs].decode("utf-8")
-            d = self.context.ss(s)
-            self._i[i] = d
-            offset += bs + 1
-        return self, offset
+    def _eq(self, other: Any) -> bool:
+        if self.context is other.context:
+            return bool(self._i == other._i)
+        return len(self._i) == len(other._i) and self.context.lookup_bytes_many(
+            self._i
+        ) == other.context.lookup_bytes_many(other._i)
+
+    def _ranged_frombytes(
+        self, sz: int, data: BytesLike, offset: int
+    ) -> Tuple[KObj, int]:
+        raws = _split_symbols(data, offset, sz)
+        self._i = self.context.ss_bytes_many(raws)
+        return self, offset + sum(map(len, raws)) + sz
 
 
 class KLongArray(KRangedType):
+    __slots__ = ("_j",)
+
     def __init__(self, t: int = TypeEnum.KJ, sz: int = 0, attr: int = 0) -> None:
         super().__init__(t, attr=attr)
-        self._j = array.array("q", [0] * sz)
+        self._j = array.array("q", bytes(8 * sz))
 
-    def _paysz(self) -> int:
-        return 2 + 4 + 8 * len(self._j)
-
-    def _databytes(self) -> bytes:
-        return struct.pack("<bBI", self.t, self.attrib, len(self._j)) + struct.pack(
-            f"<{len(self._j)}q", *self._j
-        )
+    def _encode(self, buf: bytearray) -> None:
+        buf += _VECTOR_HEADER.pack(self.t, self.attrib, len(self._j))
+        _put_array(buf, self._j)
 
     def __repr__(self) -> str:
         parts = ", ".join(repr(j) for j in self._j)
         return f"ktni({self._te_repr()}, {parts})"
 
     def kJ(self) -> "MutableSequence[int]":
+        self._version += 1
         return self._j
 
     def __len__(self) -> int:
         return len(self._j)
 
-    def _ranged_frombytes(self, sz: int, data: bytes, offset: int) -> Tuple[KObj, int]:
-        self._j = array.array("q", data[offset : offset + 8 * sz])
+    def _eq(self, other: Any) -> bool:
+        return bool(self._j == other._j)
+
+    def _ranged_frombytes(
+        self, sz: int, data: BytesLike, offset: int
+    ) -> Tuple[KObj, int]:
+        self._j = _array_frombytes("q", data, offset, 8 * sz)
         return self, offset + 8 * sz
 
 
 class KFloatArray(KRangedType):
+    __slots__ = ("_e",)
+
     def __init__(self, t: int = TypeEnum.KF, sz: int = 0, attr: int = 0) -> None:
         super().__init__(t, attr=attr)
-        self._e = array.array("f", [0] * sz)
+        self._e = array.array("f", bytes(4 * sz))
 
-    def _paysz(self) -> int:
-        return 2 + 4 + 4 * len(self._e)
-
-    def _databytes(self) -> bytes:
-        return struct.pack("<bBI", self.t, self.attrib, len(self._e)) + struct.pack(
-            f"<{len(self._e)}f", *self._e
-        )
+    def _encode(self, buf: bytearray) -> None:
+        buf += _VECTOR_HEADER.pack(self.t, self.attrib, len(self._e))
+        _put_array(buf, self._e)
 
     def __repr__(self) -> str:
         parts = ", ".join(repr(f) for f in self._e)
         return f"ktnf({self._te_repr()}, {parts})"
 
     def kE(self) -> "MutableSequence[float]":
+        self._version += 1
         return self._e
 
     def __len__(self) -> int:
         return len(self._e)
 
-    def _ranged_frombytes(self, sz: int, data: bytes, offset: int) -> Tuple[KObj, int]:
-        self._e = array.array("f", data[offset : offset + 4 * sz])
+    def _eq(self, other: Any) -> bool:
+        return _same_bits(self._e, other._e)
+
+    def _ranged_frombytes(
+        self, sz: int, data: BytesLike, offset: int
+    ) -> Tuple[KObj, int]:
+        self._e = _array_frombytes("f", data, offset, 4 * sz)
         return self, offset + 4 * sz
 
 
 class KDoubleArray(KRangedType):
+    __slots__ = ("_f",)
+
     def __init__(self, t: int = TypeEnum.KF, sz: int = 0, attr: int = 0) -> None:
         super().__init__(t, attr=attr)
-        self._f = array.array("d", [0] * sz)
+        self._f = array.array("d", bytes(8 * sz))
 
-    def _paysz(self) -> int:
-        return 2 + 4 + 8 * len(self._f)
-
-    def _databytes(self) -> bytes:
-        return struct.pack("<bBI", self.t, self.attrib, len(self._f)) + struct.pack(
-            f"<{len(self._f)}d", *self._f
-        )
+    def _encode(self, buf: bytearray) -> None:
+        buf += _VECTOR_HEADER.pack(self.t, self.attrib, len(self._f))
+        _put_array(buf, self._f)
 
     def __repr__(self) -> str:
         parts = ", ".join(repr(f) for f in self._f)
         return f"ktnf({self._te_repr()}, {parts})"
 
     def kF(self) -> "MutableSequence[float]":
+        self._version += 1
         return self._f
 
     def __len__(self) -> int:
         return len(self._f)
 
-    def _ranged_frombytes(self, sz: int, data: bytes, offset: int) -> Tuple[KObj, int]:
-        self._f = array.array("d", data[offset : offset + 8 * sz])
+    def _eq(self, other: Any) -> bool:
+        return _same_bits(self._f, other._f)
+
+    def _ranged_frombytes(
+        self, sz: int, data: BytesLike, offset: int
+    ) -> Tuple[KObj, int]:
+        self._f = _array_frombytes("d", data, offset, 8 * sz)
         return self, offset + 8 * sz
 
 
 class KCharArray(KRangedType):
+    __slots__ = ("_c", "_chars")
+
     def __init__(self, t: int = TypeEnum.KC, sz: int = 0, attr: int = 0) -> None:
         super().__init__(t, attr=attr)
-        self._c: array.array[str] = array.array("u", [" "] * sz)
+        # utf-8 encoded, as sent on the wire
+        self._c = bytearray(b" " * sz)
+        # adaptor handed out by kC, kept for what it knows of the text
+        self._chars: Optional[CharBytesAdaptor] = None
 
-    def _paysz(self) -> int:
-        bs = self._c.tounicode().encode("utf-8")
-        return 2 + 4 + 1 * len(bs)
-
-    def _databytes(self) -> bytes:
-        bs = self._c.tounicode().encode("utf-8")
-        return struct.pack("<bBI", self.t, self.attrib, len(bs)) + bs
+    def _encode(self, buf: bytearray) -> None:
+        buf += _VECTOR_HEADER.pack(self.t, self.attrib, len(self._c))
+        _put_bytes(buf, self._c)
 
     def __repr__(self) -> str:
         return f"cv({repr(self.aS())})"
 
-    def kC(self) -> array.array:  # type: ignore[type-arg]
-        return self._c
+    def kC(self) -> CharBytesAdaptor:
+        self._version += 1
+        return self._adaptor()
+
+    def _adaptor(self) -> CharBytesAdaptor:
+        if self._chars is None or self._chars.data is not self._c:
+            self._chars = CharBytesAdaptor(self._c)
+        return self._chars
 
     def aS(self) -> str:
-        return self._c.tounicode()
+        return self._c.decode("utf-8")
 
     def __len__(self) -> int:
-        return len(self._c)
+        return len(self._adaptor())
 
-    def _ranged_frombytes(self, sz: int, data: bytes, offset: int) -> Tuple[KObj, int]:
-        s = data[offset : offset + sz].decode("utf-8")
-        self._c = array.array("u", [])
-        self._c.fromunicode(s)
+    def _eq(self, other: Any) -> bool:
+        return bool(self._c == other._c)
+
+    def _ranged_frombytes(
+        self, sz: int, data: BytesLike, offset: int
+    ) -> Tuple[KObj, int]:
+        self._c = bytearray(memoryview(data)[offset : offset + sz])
         return self, offset + sz
 
 
 class KObjArray(KRangedType):
+    __slots__ = ("_k",)
+
     def __init__(self, t: int = TypeEnum.K) -> None:
         super().__init__(0)
-        self._k: List[KObj] = []
-
-    def _paysz(self) -> int:
-        # sum sizes nested ks
-        return 2 + 4 + sum([ko._paysz() for ko in self._k])
-
-    def _databytes(self) -> bytes:
-        parts = [struct.pack("<bBI", self.t, self.attrib, len(self._k))]
-        parts.extend(ko._databytes() for ko in self._k)
-        return b"".join(parts)
+        self._k: MutableSequence[KObj] = []
+
+    def _encode(self, buf: bytearray) -> None:
+        buf += _VECTOR_HEADER.pack(self.t, self.attrib, len(self._k))
+        if isinstance(self._k, LazyKObjAdaptor):
+            # elements never accessed are copied verbatim from the receive buffer
+            for i in range(len(self._k)):
+                raw = self._k.raw(i)
+                if raw is not None:
+                    buf += raw
+                else:
+                    self._k[i]._encode(buf)
+            return
+        for ko in self._k:
+            ko._encode(buf)
 
     def __repr__(self) -> str:
         return "kk(" + (", ".join([repr(k) for k in self._k])) + ")"
 
     def kK(self) -> "MutableSequence[KObj]":
+        self._version += 1
         return self._k
 
     def __len__(self) -> int:
         return len(self._k)
 
-    def _ranged_frombytes(self, sz: int, data: bytes, offset: int) -> Tuple[KObj, int]:
+    def _eq(self, other: Any) -> bool:
+        a, b = self._k, other._k
+        if len(a) != len(b):
+            return False
+        if isinstance(a, LazyKObjAdaptor) and isinstance(b, LazyKObjAdaptor):
+            # elements both still undecoded compare as wire bytes
+            for i in range(len(a)):
+                ra, rb = a.raw(i), b.raw(i)
+                if ra is not None and rb is not None:
+                    if ra != rb:
+                        return False
+                elif a[i] != b[i]:
+                    return False
+            return True
+        if type(a) is list and type(b) is list:
+            return a == b
+        return all(x == y for x, y in zip(a, b))
+
+    def _ranged_frombytes(
+        self, sz: int, data: BytesLike, offset: int
+    ) -> Tuple[KObj, int]:
+        decoders = _D9_EAGER
+        context = self.context
+        k = self._k
         for i in range(sz):
-            obj, offset = _d9_unpackfrom(data, offset)
-            self._k.append(obj)
+            obj, offset = decoders[data[offset]](data, offset + 1, context)
+            k.append(obj)
         return self, offset
 
 
 class KUUIDArray(KRangedType):
-    def __init__(self, t: int = TypeEnum.UU, sz: int = 0, attr: int = 0) -> None:
-        super().__init__(TypeEnum.UU)
-        self._u: List[uuid.UUID] = [uuid.UUID(int=0)] * sz
+    __slots__ = ("_u",)
 
-    def _paysz(self) -> int:
-        # sum sizes nested ks
-        return 2 + 4 + 16 * len(self._u)
+    def __init__(self, t: int = TypeEnum.UU, sz: int = 0, attr: int = 0) -> None:
+        super().__init__(TypeEnum.UU, attr=attr)
+        # contiguous 16 byte GUIDs, in wire order
+        self._u = bytearray(16 * sz)
 
-    def _databytes(self) -> bytes:
-        parts = [struct.pack("<bBI", self.t, self.attrib, len(self._u))]
-        parts.extend(uu.bytes for uu in self._u)
-        return b"".join(parts)
+    def _encode(self, buf: bytearray) -> None:
+        buf += _VECTOR_HEADER.pack(self.t, self.attrib, len(self._u) // 16)
+        _put_bytes(buf, self._u)
 
     def __repr__(self) -> str:
-        parts = ", ".join([repr(k) for k in self._u])
+        parts = ", ".join([repr(k) for k in self.kU()])
         return f"ktnu({parts})"
 
     def kU(self) -> "MutableSequence[uuid.UUID]":
-        return self._u
+        self._version += 1
+        return UUIDBytesAdaptor(self._u)
 
     def __len__(self) -> int:
-        return len(self._u)
+        return len(self._u) // 16
 
-    def _ranged_frombytes(self, sz: int, data: bytes, offset: int) -> Tuple[KObj, int]:
-        for i in range(sz):
-            start = offset + i * 16
-            self._u.append(uuid.UUID(bytes=data[start : start + 16]))
+    def _eq(self, other: Any) -> bool:
+        return bool(self._u == other._u)
+
+    def _ranged_frombytes(
+        self, sz: int, data: BytesLike, offset: int
+    ) -> Tuple[KObj, int]:
+        self._u = bytearray(memoryview(data)[offset : offset + 16 * sz])
         return self, offset + 16 * sz
 
 
-def b9(k: KObj, msgtype: int = 0, flags: int = 0) -> bytes:
-    # 8 byte header
-    msglen = 8 + k._paysz()
-    return struct.pack("<BBHI", 1, msgtype, flags, msglen) + k._databytes()
+class KVectorView(KObj):
+    """Elements start to stop of a vector, sharing its storage rather than copying
+    it. Numeric, symbol, boolean and GUID accessors give memoryviews over the base
+    storage, so element writes go through to the vector. The base vector must not
+    be resized while views of it are in use; char and general list accessors give
+    copies of the window."""
+
+    __slots__ = ("_base", "_start", "_stop")
+
+    def __init__(self, base: KObj, start: int, stop: int) -> None:
+        if isinstance(base, KVectorView):
+            start, stop = start + base._start, stop + base._start
+            base = base._base
+        if not 0 <= start <= stop <= len(base):
+            raise IndexError(f"view {start}:{stop} of vector of {len(base)}")
+        # any window of a sorted vector is sorted, other attributes may not hold
+        attr = AttrEnum.SORTED if base.attrib == AttrEnum.SORTED else AttrEnum.NONE
+        super().__init__(base.t, base.context, attr=attr)
+        self._base: KObj = base
+        self._start: int = start
+        self._stop: int = stop
+
+    def _window(self, storage: Any, width: int = 1) -> memoryview:
+        return memoryview(storage)[width * self._start : width * self._stop]
+
+    def _encode(self, buf: bytearray) -> None:
+        base, t = self._base, self.t
+        if self._stop > len(base):
+            raise ValueError(f"view {self._start}:{self._stop} of resized vector")
+        buf += _VECTOR_HEADER.pack(t, self.attrib, self._stop - self._start)
+        if t == TypeEnum.K:
+            for ko in base.kK()[self._start : self._stop]:
+                ko._encode(buf)
+        elif t == TypeEnum.KS:
+            ints = self._window(base.kI())
+            _put_bytes(buf, self.context.lookup_bytes_many(ints))
+        elif t == TypeEnum.UU:
+            _put_bytes(buf, self._window(base._u, 16))  # type: ignore[attr-defined]
+        elif t == TypeEnum.KC:
+            _put_bytes(buf, self._window(base._c))  # type: ignore[attr-defined]
+        else:
+            storage = _column_storage(base)
+            if _BYTESWAP:
+                _put_array(buf, storage[self._start : self._stop])
+            else:
+                _put_bytes(buf, self._window(storage))
+
+    def __repr__(self) -> str:
+        return f"{self._base!r}[{self._start}:{self._stop}]"
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def kG(self) -> "MutableSequence[int]":
+        return cast("MutableSequence[int]", self._window(self._base.kG()))
+
+    def kB(self) -> "MutableSequence[bool]":
+        return BoolByteAdaptor(self.kG())
+
+    def kH(self) -> "MutableSequence[int]":
+        return cast("MutableSequence[int]", self._window(self._base.kH()))
+
+    def kI(self) -> "MutableSequence[int]":
+        return cast("MutableSequence[int]", self._window(self._base.kI()))
+
+    def kJ(self) -> "MutableSequence[int]":
+        return cast("MutableSequence[int]", self._window(self._base.kJ()))
+
+    def kE(self) -> "MutableSequence[float]":
+        return cast("MutableSequence[float]", self._window(self._base.kE()))
+
+    def kF(self) -> "MutableSequence[float]":
+        return cast("MutableSequence[float]", self._window(self._base.kF()))
 
+    def kS(self) -> "MutableSequence[str]":
+        if self.t != TypeEnum.KS:
+            raise self._te()
+        return SymIntAdaptor(self.kI(), self.context)
+
+    def kU(self) -> "MutableSequence[uuid.UUID]":
+        if self.t != TypeEnum.UU:
+            raise self._te()
+        data = self._window(self._base._u, 16)  # type: ignore[attr-defined]
+        return UUIDBytesAdaptor(cast(bytearray, data))
+
+    def kC(self) -> CharBytesAdaptor:
+        if self.t != TypeEnum.KC:
+            raise self._te()
+        return CharBytesAdaptor(bytearray(self._window(self._base._c)))  # type: ignore[attr-defined]
+
+    def aS(self) -> str:
+        return self.kC().tounicode()
+
+    def kK(self) -> "MutableSequence[KObj]":
+        return self._base.kK()[self._start : self._stop]
 
-def d9(data: bytes) -> KObj:
+
+def _b9_buffer(k: KObj, msgtype: int = 0, flags: int = 0) -> bytearray:
+    # single pass: reserve the 8 byte header, let the object tree append itself to
+    # one growable buffer, then patch the header once the total length is known
+    buf = bytearray(8)
+    k._encode(buf)
+    _HEADER.pack_into(buf, 0, 1, msgtype, flags, len(buf))
+    return buf
+
+
+def b9(k: KObj, msgtype: int = 0, flags: int = 0) -> bytes:
+    return bytes(_b9_buffer(k, msgtype, flags))
+
+
+def b9_chunks(
+    k: KObj, msgtype: int = 0, flags: int = 0
+) -> List[Union[bytes, memoryview]]:
+    # encode to a list of buffers that concatenate to b9(k), suitable for
+    # writelines(). Large vectors appear as memoryviews over their own storage
+    # rather than being copied, so must not be modified until the chunks are sent;
+    # arrays raise BufferError if resized while a view is held
+    buf = _ChunkedBuffer()
+    k._encode(buf)
+    chunks = buf.finish()
+    chunks.insert(0, _HEADER.pack(1, msgtype, flags, 8 + buf.flushed))
+    return chunks
+
+
+def d9(
+    data: BytesLike, lazy: bool = False, context: KContext = DEFAULT_CONTEXT
+) -> KObj:
     # raises struct.error on underflow
-    ver, msgtype, flags, msglen = struct.unpack_from("<BBHI", data, offset=0)
+    # lazy=True defers decoding the elements of general lists (and so dict values and
+    # table columns) until they are accessed, retaining the buffer until then.
+    # Symbols are interned in context, see KContext
+    ver, msgtype, flags, msglen = _HEADER.unpack_from(data, 0)
     if len(data) < msglen:
         raise ValueError(
             f"buffer is too short, required {msglen} bytes, got {len(data)}"
         )
-    offset = 8
+    return _d9_payload(data, 8, msglen, flags, lazy, context)
+
+
+def _d9_payload(
+    data: BytesLike,
+    offset: int,
+    end: int,
+    flags: int,
+    lazy: bool = False,
+    context: KContext = DEFAULT_CONTEXT,
+) -> KObj:
+    # decode the message body found at data[offset:end], leaving the buffer in place
+    # so the header need not be re-joined to the payload received from a stream
     if flags == 1:
-        data = decompress(data[8:])
+        data = decompress(bytes(data[offset:end]))
         offset = 0
-        msglen = len(data)
+        end = len(data)
     elif flags != 0:
         raise ValueError(
-            f"unknown payload flags={flags} - not yet implemented, please open an Issue. Buffer: {data[:16].hex()}"
+            f"unknown payload flags={flags} - not yet implemented, please open an Issue. Buffer: {data[offset : offset + 16].hex()}"
         )
     try:
-        k, pos = _d9_unpackfrom(data, offset=offset)
-        if pos != msglen:
-            raise Exception(f"Final position at {pos} expected {msglen}")
+        k, pos = _d9_unpackfrom(data, offset=offset, lazy=lazy, context=context)
+        if pos != end:
+            raise Exception(f"Final position at {pos} expected {end}")
     except ValueError as ve:
-        raise Exception(f"While unpacking buffer {data[:100]!r}") from ve
+        raise Exception(
+            f"While unpacking buffer {data[offset : offset + 100]!r}"
+        ) from ve
     return k
 
 
-def _d9_unpackfrom(data: bytes, offset: int) -> Tuple[KObj, int]:
-    (t,) = struct.unpack_from("<b", data, offset=offset)
-    offset += 1
-    logger.debug(
-        f" at offset {offset}/{len(data)} unpacking type {tn(t)} peek {data[offset : offset + 100]!r}"
+def _d9_unpackfrom(
+    data: BytesLike,
+    offset: int,
+    lazy: bool = False,
+    context: KContext = DEFAULT_CONTEXT,
+) -> Tuple[KObj, int]:
+    # the type byte indexes straight into a table of decoders, see _d9_table
+    decoders = _D9_LAZY if lazy else _D9_EAGER
+    return decoders[data[offset]](data, offset + 1, context)
+
+
+def _d9_table(lazy: bool) -> List[_Decoder]:
+    # one decoder per unsigned type byte, built once so decoding an object is a
+    # single list index rather than a chain of type comparisons
+    table: List[_Decoder] = []
+
+    def symbol(t: int) -> _Decoder:
+        def decode(data: BytesLike, offset: int, context: KContext) -> Tuple[KObj, int]:
+            return KSymAtom(t, context).frombytes(data, offset)
+
+        return decode
+
+    def vector(t: int) -> _Decoder:
+        # enumerations 20-29 are carried as longs
+        cls = VECTOR_CONSTUCTORS[TypeEnum.KJ if t >= 20 else TypeEnum(t)]
+
+        def decode(data: BytesLike, offset: int, context: KContext) -> Tuple[KObj, int]:
+            k = cls(t)
+            k.context = context
+            return k.frombytes(data, offset)
+
+        return decode
+
+    def dictionary(t: int) -> _Decoder:
+        def decode(data: BytesLike, offset: int, context: KContext) -> Tuple[KObj, int]:
+            kkeys, offset = table[data[offset]](data, offset + 1, context)
+            kvalues, offset = table[data[offset]](data, offset + 1, context)
+            return _kdict_unchecked(kkeys, kvalues, t), offset
+
+        return decode
+
+    def flip(data: BytesLike, offset: int, context: KContext) -> Tuple[KObj, int]:
+        attrib = data[offset]
+        kd, offset = table[data[offset + 1]](data, offset + 2, context)
+        return _kflip_unchecked(kd, attrib), offset
+
+    def fn(data: BytesLike, offset: int, context: KContext) -> Tuple[KObj, int]:
+        return KFnAtom().frombytes(data, offset)
+
+    def op(data: BytesLike, offset: int, context: KContext) -> Tuple[KObj, int]:
+        return KOpAtom().frombytes(data, offset)
+
+    def unknown(t: int) -> _Decoder:
+        def decode(data: BytesLike, offset: int, context: KContext) -> Tuple[KObj, int]:
+            raise ValueError(f"Unable to d9 unpack t={t}")
+
+        return decode
+
+    for u in range(256):
+        t = u - 256 if u > 127 else u
+        decoder: _Decoder
+        if t == -TypeEnum.KS or t == TypeEnum.KRR:
+            decoder = symbol(t)
+        elif (t < 0 and -t in ATOM_LENGTH) or t == TypeEnum.NIL:
+            decoder = _d9_atom_decoder(t)
+        elif t == TypeEnum.K and lazy:
+            decoder = _d9_lazy_list
+        elif t in VECTOR_CONSTUCTORS or 20 <= t < 30:
+            decoder = vector(t)
+        elif t == TypeEnum.XD or t == TypeEnum.SD:
+            decoder = dictionary(t)
+        elif t == TypeEnum.XT:
+            decoder = flip
+        elif t == TypeEnum.FN:
+            decoder = fn
+        elif t == TypeEnum.OP:
+            decoder = op
+        else:
+            decoder = unknown(t)
+        table.append(decoder)
+    return table
+
+
+def _d9_lazy_list(data: BytesLike, offset: int, context: KContext) -> Tuple[KObj, int]:
+    # skim the element boundaries of a general list, deferring the decode
+    attrib, sz = _VECTOR_ATTR_LEN.unpack_from(data, offset)
+    offset += 5
+    spans = []
+    for i in range(sz):
+        end = _d9_skip(data, offset)
+        spans.append((offset, end))
+        offset = end
+    k = KObjArray()
+    k.attrib = attrib
+    k.context = context
+    k._k = LazyKObjAdaptor(
+        data, spans, functools.partial(_d9_unpackfrom, lazy=True, context=context)
     )
+    return k, offset
+
+
+def _d9_skip(data: BytesLike, offset: int) -> int:
+    # offset just past the object at data[offset], without constructing it.
+    # Must agree with the widths used by _d9_unpackfrom.
+    (t,) = _TYPE.unpack_from(data, offset)
+    offset += 1
     if t == -TypeEnum.KS or t == TypeEnum.KRR:
-        return KSymAtom(t).frombytes(data, offset)
-    elif t < 0:
-        return KObjAtom(t).frombytes(data, offset)
-    elif t >= 0 and t < 20:
-        # ranged vector types, need to verify t
-        return VECTOR_CONSTUCTORS[t](t).frombytes(data, offset)
-    elif t == TypeEnum.NIL:
-        # seems to be a null byte after the type?
-        return KObjAtom(t).frombytes(data, offset)
-    elif t == TypeEnum.XD:
-        kkeys, offset = _d9_unpackfrom(data, offset)
-        kvalues, offset = _d9_unpackfrom(data, offset)
-        return KDict(kkeys, kvalues), offset
+        return data.index(b"\x00", offset) + 1
+    elif t < 0 or t == TypeEnum.NIL:
+        return offset + ATOM_LENGTH[-t]
+    elif t < 30:
+        attrib, sz = _VECTOR_ATTR_LEN.unpack_from(data, offset)
+        offset += 5
+        if t == TypeEnum.K:
+            for i in range(sz):
+                offset = _d9_skip(data, offset)
+            return offset
+        elif t == TypeEnum.KS:
+            return int(offset + sum(map(len, _split_symbols(data, offset, sz))) + sz)
+        return int(offset + ATOM_LENGTH[t if t < 20 else TypeEnum.KJ] * sz)
+    elif t == TypeEnum.XD or t == TypeEnum.SD:
+        return _d9_skip(data, _d9_skip(data, offset))
     elif t == TypeEnum.XT:
-        kkeys, offset = _d9_unpackfrom(data, offset + 1)
-        return KFlip(kkeys), offset
-    elif t == TypeEnum.SD:
-        kkeys, offset = _d9_unpackfrom(data, offset)
-        kvalues, offset = _d9_unpackfrom(data, offset)
-        return KDict(kkeys, kvalues, t), offset
+        return _d9_skip(data, offset + 1)
     elif t == TypeEnum.FN:
-        return KFnAtom().frombytes(data, offset)
+        prelude_len = {0: 3, 104: 4, 113: 4}[data[offset]]
+        (sz,) = _INT.unpack_from(data, offset + prelude_len)
+        return int(offset + prelude_len + 4 + sz)
     elif t == TypeEnum.OP:
-        return KOpAtom().frombytes(data, offset)
-    elif t >= 20 and t < 30:
-        return VECTOR_CONSTUCTORS[TypeEnum.KJ](t).frombytes(data, offset)
-    raise ValueError(f"Unable to d9 unpack t={t}")
+        return offset + 1
+    raise ValueError(f"Unable to d9 skip t={t}")
 
 
 # atom constructors
@@ -1009,8 +1561,8 @@ def kp(i: int) -> KObj:
     return KObjAtom(-TypeEnum.KP).j(i)
 
 
-def ks(s: str) -> KObj:
-    return KSymAtom(-TypeEnum.KS).ss(s)
+def ks(s: str, context: KContext = DEFAULT_CONTEXT) -> KObj:
+    return KSymAtom(-TypeEnum.KS, context).ss(s)
 
 
 def kuu(uu: uuid.UUID) -> KObj:
@@ -1040,16 +1592,27 @@ VECTOR_CONSTUCTORS: Dict[TypeEnum, Type[KObj]] = {
     TypeEnum.KT: KIntArray,
 }
 
+_D9_EAGER = _d9_table(lazy=False)
+_D9_LAZY = _d9_table(lazy=True)
+
 
-def ktn(t: TypeEnum, sz: int = 0, attr: AttrEnum = AttrEnum.NONE) -> KObj:
+def ktn(
+    t: TypeEnum,
+    sz: int = 0,
+    attr: AttrEnum = AttrEnum.NONE,
+    context: KContext = DEFAULT_CONTEXT,
+) -> KObj:
     if t == TypeEnum.K:
         if sz > 0:
             raise ValueError("ktn K can only be empty at initialisation")
-        return KObjArray(t)
-    try:
-        return VECTOR_CONSTUCTORS[t](t, sz=sz, attr=attr)
-    except KeyError:
-        raise ValueError(f"ktn for type {tn(t)}")
+        k: KObj = KObjArray(t)
+    else:
+        try:
+            k = VECTOR_CONSTUCTORS[t](t, sz=sz, attr=attr)
+        except KeyError:
+            raise ValueError(f"ktn for type {tn(t)}")
+    k.context = context
+    return k
 
 
 def kk(*objs: KObj) -> KObj:
@@ -1067,7 +1630,26 @@ def cv(s: str) -> KObj:
     return k
 
 
+# dict key vectors held as arrays of ints, by the attribute holding their array
+_DICT_INT_KEYS = {
+    TypeEnum.KG: "_g",
+    TypeEnum.KH: "_h",
+    TypeEnum.KI: "_i",
+    TypeEnum.KJ: "_j",
+    TypeEnum.KS: "_i",  # symbol indexes
+    TypeEnum.KP: "_j",
+    TypeEnum.KM: "_i",
+    TypeEnum.KD: "_i",
+    TypeEnum.KN: "_j",
+    TypeEnum.KU: "_i",
+    TypeEnum.KV: "_i",
+    TypeEnum.KT: "_i",
+}
+
+
 class KDict(KObj):
+    __slots__ = ("_kkey", "_kvalue", "_index", "_indexed", "_indexed_keys")
+
     def __init__(self, kkeys: KObj, kvalues: KObj, t: TypeEnum = TypeEnum.XD):
         if len(kkeys) != len(kvalues):
             raise ValueError("dict keys and values must be same length")
@@ -1076,16 +1658,15 @@ class KDict(KObj):
             raise ValueError(f"Keys not sorted for SD {kkeys._tn()}")
         self._kkey = kkeys
         self._kvalue = kvalues
+        # key to position, built on the first lookup, see _find
+        self._index: Optional[Dict[Any, int]] = None
+        self._indexed: Any = None
+        self._indexed_keys: Any = None
 
-    def _paysz(self) -> int:
-        return 1 + self._kkey._paysz() + self._kvalue._paysz()
-
-    def _databytes(self) -> bytes:
-        return (
-            struct.pack("<B", self.t)
-            + self._kkey._databytes()
-            + self._kvalue._databytes()
-        )
+    def _encode(self, buf: bytearray) -> None:
+        buf.append(self.t & 0xFF)
+        self._kkey._encode(buf)
+        self._kvalue._encode(buf)
 
     def __repr__(self) -> str:
         suffix = ", sorted=True" if self.t == TypeEnum.SD else ""
@@ -1094,6 +1675,9 @@ class KDict(KObj):
     def __len__(self) -> int:
         return len(self._kkey)
 
+    def _eq(self, other: Any) -> bool:
+        return bool(self._kkey == other._kkey and self._kvalue == other._kvalue)
+
     def kkey(self) -> KObj:
         return self._kkey
 
@@ -1109,61 +1693,279 @@ class KDict(KObj):
 
         raise KeyError(f"Keys as strings not possible on {self._kkey._tn()}")
 
-    def __getitem__(self, item: Union[int, str]) -> KObj:
-        if not isinstance(item, str):
-            raise ValueError("cannot index dict by int")
-        if self._kkey.t == TypeEnum.KS:
-            try:
-                idx = self.kkey().kS().index(item)
-                return self.kvalue().kK()[idx]
-            except ValueError:
-                raise KeyError(f"Key not found {item}")
-        elif self._kkey.t == TypeEnum.K:
-            # check for any nested atomic symbol keys within the K object array
-            for idx in range(len(self._kkey)):
-                k = self._kkey.kK()[idx]
-                if k.t == -TypeEnum.KS:
-                    if k.aS() == item:
-                        return self.kvalue().kK()[idx]
-            raise KeyError(f"Key not found {item}")
-
-        raise KeyError(f"Key lookup not possible on {self._kkey._tn()}")
+    def __getitem__(self, item: Union[int, str, uuid.UUID]) -> KObj:
+        # value for a symbol, integer or GUID key, or a symbol or integer atom
+        # of a general list of keys. Non-general values are returned as atoms
+        idx = self._find(item)
+        if self._kvalue.t == TypeEnum.K:
+            return self._kvalue.kK()[idx]
+        return atomic_from_vect_index(self._kvalue, idx)
+
+    def __contains__(self, item: Any) -> bool:
+        try:
+            self._find(item)
+        except KeyError:
+            return False
+        return True
+
+    def _keys(self, lo: int = 0, hi: Optional[int] = None) -> Any:
+        # copy of keys lo to hi as lookup keys: symbol indexes, integers, GUID
+        # bytes, or those of a list of atoms. Read from the storage itself, so
+        # as not to bump the version of the key vector
+        kkey = self._kkey
+        base: KObj = kkey
+        if hi is None:
+            hi = len(kkey)
+        if isinstance(kkey, KVectorView):
+            base, lo, hi = kkey._base, kkey._start + lo, kkey._start + hi
+        if kkey.t in _DICT_INT_KEYS:
+            return getattr(base, _DICT_INT_KEYS[TypeEnum(kkey.t)])[lo:hi]
+        elif kkey.t == TypeEnum.UU:
+            raw = bytes(cast(KUUIDArray, base)._u[16 * lo : 16 * hi])
+            return [raw[i : i + 16] for i in range(0, len(raw), 16)]
+        elif kkey.t == TypeEnum.K:
+            k = cast(KObjArray, base)._k
+            return [_dict_atom_key(k[i]) for i in range(lo, hi)]
+        raise KeyError(f"Key lookup not possible on {kkey._tn()}")
+
+    def _reindex(self, keys: Any) -> Dict[Any, int]:
+        # built backwards so the first of any repeated keys wins
+        self._index = dict(zip(reversed(keys), range(len(keys))[::-1]))
+        self._indexed = _dict_key_version(self._kkey)
+        self._indexed_keys = keys
+        return self._index
+
+    def _find(self, item: Any) -> int:
+        # position of the first key equal to item. The index of positions is
+        # built on the first lookup, and rebuilt once after the keys change:
+        # each accessor handing out their storage, eg. kkey().kS(), bumps the
+        # key vector's version. Storage taken before the index was built and
+        # modified in place is caught by checking the key found, and on a miss
+        # by comparing the keys with those indexed
+        kkey = self._kkey
+        if kkey.t == TypeEnum.KS:
+            if not isinstance(item, str):
+                raise KeyError(item)
+            key: Any = kkey.context.symbols.get(item)
+            if key is None:
+                raise KeyError(item)
+        elif kkey.t == TypeEnum.UU:
+            if not isinstance(item, uuid.UUID):
+                raise KeyError(item)
+            key = item.bytes
+        elif kkey.t == TypeEnum.K:
+            if not isinstance(item, (str, int)) or isinstance(item, bool):
+                raise KeyError(item)
+            key = item
+        else:
+            if not isinstance(item, int) or isinstance(item, bool):
+                raise KeyError(item)
+            key = item
+
+        index = self._index
+        if index is None or self._indexed != _dict_key_version(kkey):
+            index = self._reindex(self._keys())
+        idx = index.get(key)
+        if idx is not None and self._keys(idx, idx + 1)[0] == key:
+            return idx
+        keys = self._keys()
+        if keys == self._indexed_keys:
+            raise KeyError(item)
+        idx = self._reindex(keys).get(key)
+        if idx is None:
+            raise KeyError(item)
+        return idx
+
+
+# lookup key of atoms that no item matches
+_NO_KEY = object()
+
+
+def _dict_atom_key(k: KObj) -> Any:
+    # lookup key of one element of a general list of dict keys
+    if k.t == -TypeEnum.KS:
+        return k.aS()
+    elif k.t == -TypeEnum.KJ:
+        return k.aJ()
+    elif k.t == -TypeEnum.KI:
+        return k.aI()
+    elif k.t == -TypeEnum.KH:
+        return k.aH()
+    return _NO_KEY
+
+
+def _dict_key_version(kkey: KObj) -> Any:
+    # changes whenever dict keys may have, see KDict._find. The length is
+    # included for appends through storage taken before indexing
+    if isinstance(kkey, KVectorView):
+        base = kkey._base
+        return (getattr(base, "_version", 0), len(base), kkey._start, kkey._stop)
+    return (getattr(kkey, "_version", 0), len(kkey))
 
 
 def atomic_from_vect_index(v: KObj, index: int) -> KObj:
     # tricky: get index item from v
-    if v.t == TypeEnum.KJ:
-        return kj(v.kJ()[index])
-    elif v.t == TypeEnum.KI:
-        return ki(v.kI()[index])
-    elif v.t == TypeEnum.KH:
-        return kh(v.kH()[index])
-    elif v.t == TypeEnum.KB:
-        return kb(v.kB()[index])
+    if isinstance(v, KVectorView):
+        n = len(v)
+        if not -n <= index < n:
+            raise IndexError(f"index {index} of view of {n}")
+        return atomic_from_vect_index(v._base, v._start + index % n)
+    elif v.t == TypeEnum.K:
+        return v.kK()[index]
+    elif v.t == TypeEnum.KS:
+        # symbol index
+        atom = KSymAtom(-TypeEnum.KS, v.context)
+        atom.data = struct.pack("i", v.kI()[index])
+        return atom
     elif v.t == TypeEnum.UU:
         return kuu(v.kU()[index])
-    elif v.t == TypeEnum.KG:
-        return kg(v.kG()[index])
-    elif v.t == TypeEnum.KF:
-        return kf(v.kF()[index])
-    elif v.t == TypeEnum.KG:
-        return kg(v.kG()[index])
     elif v.t == TypeEnum.KC:
         return kc(v.kC()[index])
-    elif v.t == TypeEnum.KS:
-        # symbol index
-        si = v.kI()[index]
-        # TODO: could improve this further since ks repeats lookup
-        return ks(v.context.lookup_str(si))
-    elif v.t == TypeEnum.KP:
-        return kp(v.kJ()[index])
-    elif v.t == TypeEnum.K:
-        return v.kK()[index]
-    else:
-        raise ValueError(f"no box/unbox defined for {v}")
+    elif 0 < v.t < 20:
+        # the atom's data is the element's bytes, the array typecodes being
+        # struct format characters
+        storage = _column_storage(v)
+        boxed = KObjAtom(-v.t)
+        boxed.data = struct.pack("<" + storage.typecode, storage[index])
+        return boxed
+    raise ValueError(f"no box/unbox defined for {v}")
+
+
+def _kdict_unchecked(kkeys: KObj, kvalues: KObj, t: int) -> "KDict":
+    # construct a dict from trusted wire data, skipping the length and sort checks
+    kd = KDict.__new__(KDict)
+    KObj.__init__(kd, t)
+    kd._kkey = kkeys
+    kd._kvalue = kvalues
+    kd._index = None
+    kd._indexed = None
+    kd._indexed_keys = None
+    return kd
+
+
+def _kflip_unchecked(kd: KObj, attrib: int) -> "KFlip":
+    # construct a flip from trusted wire data, skipping the column checks
+    flip = KFlip.__new__(KFlip)
+    KObj.__init__(flip, TypeEnum.XT, attr=attrib)
+    flip._kvalue = kd
+    flip._columns = None
+    return flip
+
+
+def _column_getter(col: KObj) -> Callable[[int], Any]:
+    # python value of one row of a table column, straight from its storage.
+    # Temporal types give their underlying integers, general lists their KObjs
+    t = col.t
+    if t == TypeEnum.KS:
+        lookup = col.context.lookup_str
+        ints = col.kI()
+        return lambda i: lookup(ints[i])
+    elif t == TypeEnum.KB:
+        bools = col.kG()
+        return lambda i: bool(bools[i])
+    elif t == TypeEnum.UU:
+        return col.kU().__getitem__
+    elif t == TypeEnum.KC:
+        return col.kC().__getitem__
+    elif t == TypeEnum.K:
+        return col.kK().__getitem__
+    return cast(Callable[[int], Any], _column_storage(col).__getitem__)
+
+
+def _column_values(col: KObj) -> Iterable[Any]:
+    # every row of a column as _column_getter gives them, iterated in C
+    t = col.t
+    if t == TypeEnum.KS:
+        return col.context.lookup_many(col.kI())
+    elif t == TypeEnum.KB:
+        return map(bool, col.kG())
+    elif t == TypeEnum.UU:
+        return iter(col.kU())
+    elif t == TypeEnum.KC:
+        return iter(col.kC().tounicode())
+    elif t == TypeEnum.K:
+        return col.kK()
+    return cast(Iterable[Any], _column_storage(col))
+
+
+def _column_storage(col: KObj) -> Any:
+    # array of a numeric or temporal column
+    width = ATOM_LENGTH.get(TypeEnum.KJ if col.t >= 20 else col.t)
+    if col.t in (TypeEnum.KE, TypeEnum.KF, TypeEnum.KZ):
+        return col.kE() if col.t == TypeEnum.KE else col.kF()
+    elif width == 1:
+        return col.kG()
+    elif width == 2:
+        return col.kH()
+    elif width == 4:
+        return col.kI()
+    elif width == 8:
+        return col.kJ()
+    raise ValueError(f"no python values for column of {col._tn()}")
+
+
+class _TableColumns:
+    # names, positions and row getters of a table's columns, cached by KFlip
+    # for as long as the same column objects and names remain
+    __slots__ = ("names", "positions", "columns", "symbols", "getters")
+
+    def __init__(self, kd: KObj) -> None:
+        self.symbols = kd.kkey().kI()[:]
+        self.columns = list(kd.kvalue().kK())
+        self.names = list(kd.kkey().kS())
+        # built backwards so the first of any repeated names wins
+        self.positions = dict(zip(reversed(self.names), range(len(self.names))[::-1]))
+        self.getters = [_column_getter(c) for c in self.columns]
+
+    def current(self, kd: KObj) -> bool:
+        columns = kd.kvalue().kK()
+        return (
+            len(columns) == len(self.columns)
+            and all(map(operator.is_, columns, self.columns))
+            and kd.kkey().kI() == self.symbols
+        )
+
+
+class TableRow:
+    """View of one row of a table, reading python values from the columns on
+    access by name or position. Cheap to create, nothing is copied."""
+
+    __slots__ = ("_columns", "_i")
+
+    def __init__(self, columns: _TableColumns, i: int) -> None:
+        self._columns = columns
+        self._i = i
+
+    def __getitem__(self, key: Union[int, str]) -> Any:
+        columns = self._columns
+        if isinstance(key, str):
+            try:
+                key = columns.positions[key]
+            except KeyError:
+                raise KeyError(f"Column not found {key}")
+        return columns.getters[key](self._i)
+
+    def __len__(self) -> int:
+        return len(self._columns.names)
+
+    def __iter__(self) -> Iterator[Any]:
+        i = self._i
+        return (getter(i) for getter in self._columns.getters)
+
+    def keys(self) -> List[str]:
+        return self._columns.names
+
+    def asdict(self) -> Dict[str, Any]:
+        return dict(zip(self._columns.names, self))
+
+    def __repr__(self) -> str:
+        parts = ", ".join(f"{k}={v!r}" for k, v in zip(self._columns.names, self))
+        return f"TableRow({parts})"
 
 
 class KFlip(KObj):
+    __slots__ = ("_kvalue", "_columns")
+
     def __init__(self, kd: KObj, sorted: bool = False):
         if kd.t != TypeEnum.XD:
             raise ValueError(f"can only flip a dict, not {kd._tn()}")
@@ -1186,12 +1988,12 @@ class KFlip(KObj):
             attr = AttrEnum.SORTED
         super().__init__(TypeEnum.XT, attr=attr)
         self._kvalue = kd
+        self._columns: Optional[_TableColumns] = None
 
-    def _paysz(self) -> int:
-        return 2 + self._kvalue._paysz()
-
-    def _databytes(self) -> bytes:
-        return struct.pack("<bB", self.t, self.attrib) + self._kvalue._databytes()
+    def _encode(self, buf: bytearray) -> None:
+        buf.append(self.t & 0xFF)
+        buf.append(self.attrib)
+        self._kvalue._encode(buf)
 
     def __repr__(self) -> str:
         # TODO: flip attr
@@ -1211,25 +2013,75 @@ class KFlip(KObj):
         first_col = tdict_values.kK()[0]
         return len(first_col)
 
-    def __getitem__(self, item: Union[int, str]) -> KObj:
-        if isinstance(item, int):
+    def _eq(self, other: Any) -> bool:
+        return bool(self._kvalue == other._kvalue)
+
+    @overload
+    def __getitem__(self, item: Union[int, str]) -> KObj: ...
+    @overload
+    def __getitem__(self, item: slice) -> "KFlip": ...
+    def __getitem__(self, item: Union[int, str, slice]) -> KObj:
+        if isinstance(item, slice):
+            return self._window(item)
+        elif isinstance(item, int):
             if item >= len(self):
                 raise IndexError()
-            d = self.kvalue()
-            vals = []
-            for k in self.kS():
-                v = self[k]
-                a = atomic_from_vect_index(v, item)
-                vals.append(a)
-
-            return xd(d.kkey(), kk(*vals))
+            columns = self._table_columns().columns
+            vals = [atomic_from_vect_index(c, item) for c in columns]
+            return xd(self.kvalue().kkey(), kk(*vals))
         elif isinstance(item, str):
+            # through the dict's key index, leaving lazy columns undecoded
             try:
-                idx = self.kS().index(item)
-                return self.kK()[idx]
-            except ValueError:
+                return self._kvalue[item]
+            except KeyError:
                 raise KeyError(f"Column not found {item}")
 
+    def _window(self, rows: slice) -> "KFlip":
+        # rows as a table of KVectorViews over these columns
+        start, stop, step = rows.indices(len(self))
+        if step != 1:
+            raise ValueError("table slices must have a step of 1")
+        stop = max(start, stop)
+        keys = self._kvalue.kkey()
+        names = ktn(TypeEnum.KS, context=keys.context)
+        names.kI().extend(keys.kI())
+        views = [KVectorView(c, start, stop) for c in self.kK()]
+        return _kflip_unchecked(
+            _kdict_unchecked(names, kk(*views), TypeEnum.XD), self.attrib
+        )
+
+    def select_columns(self, names: Iterable[str]) -> "KFlip":
+        # a table of the named columns, sharing their vectors rather than
+        # copying them, and keeping the table's attribute
+        names = list(names)
+        columns = [self[name] for name in names]
+        keys = ktn(TypeEnum.KS, context=self._kvalue.kkey().context).appendS(*names)
+        return _kflip_unchecked(xd(keys, kk(*columns)), self.attrib)
+
+    def _table_columns(self) -> _TableColumns:
+        columns = self._columns
+        if columns is None or not columns.current(self._kvalue):
+            columns = self._columns = _TableColumns(self._kvalue)
+        return columns
+
+    def row(self, i: int) -> TableRow:
+        # view of row i giving python values, see TableRow
+        n = len(self)
+        if not -n <= i < n:
+            raise IndexError(f"row {i} of table of {n}")
+        return TableRow(self._table_columns(), i % n if n else i)
+
+    def itertuples(self, named: bool = False) -> Iterator[Tuple[Any, ...]]:
+        # each row as a tuple of python values, read straight from the column
+        # arrays. named=True gives namedtuples, with fields renamed where the
+        # column name is not an identifier. Temporal columns give their integers
+        columns = self._table_columns()
+        rows = zip(*[_column_values(c) for c in columns.columns])
+        if not named:
+            return rows
+        Row = collections.namedtuple("Row", columns.names, rename=True)  # type: ignore[misc]
+        return map(Row._make, rows)
+
     def kS(self) -> "MutableSequence[str]":
         # column names
         return self.kvalue().kkey().kS()
@@ -1243,7 +2095,7 @@ def krr(msg: str) -> KObj:
     return KSymAtom(TypeEnum.KRR).ss(msg)
 
 
-kNil = ka(TypeEnum.NIL)
+kNil = _ATOM_FLYWEIGHTS[TypeEnum.NIL][b"\x00"]
 
 
 class KException(Exception):
@@ -1,15 +1,35 @@
 import array
+import uuid
 from collections.abc import MutableSequence, Sequence
-from typing import TYPE_CHECKING, Any, Iterable, Union, overload
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    overload,
+)
 
 from aiokdb.context import KContext
 
 if TYPE_CHECKING:
+    from aiokdb import KObj
+
     BaseBoolMutSeq = MutableSequence[bool]
     BaseSymMutSeq = MutableSequence[str]
+    BaseUUIDMutSeq = MutableSequence[uuid.UUID]
+    BaseCharMutSeq = MutableSequence[str]
+    BaseKObjMutSeq = MutableSequence[KObj]
 else:
     BaseBoolMutSeq = MutableSequence
     BaseSymMutSeq = MutableSequence
+    BaseUUIDMutSeq = MutableSequence
+    BaseCharMutSeq = MutableSequence
+    BaseKObjMutSeq = MutableSequence
 
 
 class BoolByteAdaptor(BaseBoolMutSeq):
@@ -84,7 +104,7 @@ class SymIntAdaptor(BaseSymMutSeq):
         self, index: Union[int, slice], item: Union[str, Iterable[str]]
     ) -> None:
         if isinstance(index, slice) and isinstance(item, Iterable):
-            self.data[index] = array.array("l", [self.context.ss(i) for i in item])
+            self.data[index] = self.context.ss_many(item)
         elif isinstance(index, int) and isinstance(item, str):
             self.data[index] = self.context.ss(item)
         else:
@@ -93,6 +113,12 @@ class SymIntAdaptor(BaseSymMutSeq):
     def insert(self, index: int, item: str) -> None:
         self.data.insert(index, self.context.ss(item))
 
+    def extend(self, values: Iterable[str]) -> None:
+        self.data.extend(self.context.ss_many(values))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.context.lookup_many(self.data))
+
     def __delitem__(self, item: Union[int, slice]) -> None:
         del self.data[item]
 
@@ -103,3 +129,311 @@ class SymIntAdaptor(BaseSymMutSeq):
             else:
                 return False
         raise TypeError()
+
+
+class UUIDBytesAdaptor(BaseUUIDMutSeq):
+    # GUID vector stored as contiguous 16 byte values, UUIDs are built on access
+    def __init__(self, data: bytearray):
+        self.data = data
+
+    def _index(self, i: int) -> int:
+        n = len(self)
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError("list index out of range")
+        return 16 * i
+
+    @overload
+    def __getitem__(self, i: int) -> uuid.UUID: ...
+    @overload
+    def __getitem__(self, s: slice) -> "MutableSequence[uuid.UUID]": ...
+    def __getitem__(
+        self, i: Union[int, slice]
+    ) -> Union[uuid.UUID, "MutableSequence[uuid.UUID]"]:
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step == 1:
+                return self.__class__(self.data[16 * start : 16 * stop])
+            mv = memoryview(self.data)
+            return self.__class__(
+                bytearray().join(
+                    mv[16 * j : 16 * j + 16] for j in range(start, stop, step)
+                )
+            )
+        o = self._index(i)
+        return uuid.UUID(bytes=bytes(self.data[o : o + 16]))
+
+    def __len__(self) -> int:
+        return len(self.data) // 16
+
+    @overload
+    def __setitem__(self, index: int, item: uuid.UUID) -> None: ...
+    @overload
+    def __setitem__(self, index: slice, item: Iterable[uuid.UUID]) -> None: ...
+    def __setitem__(
+        self, index: Union[int, slice], item: Union[uuid.UUID, Iterable[uuid.UUID]]
+    ) -> None:
+        if isinstance(index, slice) and isinstance(item, Iterable):
+            start, stop, step = index.indices(len(self))
+            values = [u.bytes for u in item]
+            if step == 1:
+                self.data[16 * start : 16 * stop] = b"".join(values)
+                return
+            targets = range(start, stop, step)
+            if len(values) != len(targets):
+                raise ValueError(
+                    f"attempt to assign sequence of size {len(values)} to extended slice of size {len(targets)}"
+                )
+            for j, bs in zip(targets, values):
+                self.data[16 * j : 16 * j + 16] = bs
+        elif isinstance(index, int) and isinstance(item, uuid.UUID):
+            o = self._index(index)
+            self.data[o : o + 16] = item.bytes
+        else:
+            raise TypeError()
+
+    def insert(self, index: int, item: uuid.UUID) -> None:
+        # clamp like list.insert
+        n = len(self)
+        if index < 0:
+            index = max(index + n, 0)
+        index = min(index, n)
+        self.data[16 * index : 16 * index] = item.bytes
+
+    def __delitem__(self, item: Union[int, slice]) -> None:
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step == 1:
+                del self.data[16 * start : 16 * stop]
+                return
+            for j in sorted(range(start, stop, step), reverse=True):
+                del self.data[16 * j : 16 * j + 16]
+        else:
+            o = self._index(item)
+            del self.data[o : o + 16]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, UUIDBytesAdaptor):
+            return self.data == other.data
+        if isinstance(other, Sequence):
+            if len(self) == len(other):
+                return all(a == b for a, b in zip(self, other))
+            else:
+                return False
+        raise TypeError()
+
+
+class CharBytesAdaptor(BaseCharMutSeq):
+    # char vector stored utf-8 encoded, with elements being characters. Pure ascii
+    # text (the usual case) indexes the bytes directly, otherwise the text is decoded
+    # and, when mutated, re-encoded. Offers tounicode/fromunicode like array('u').
+    # Data found to be ascii is taken to stay so until its length changes or it is
+    # rewritten here, so other writes of non-ascii bytes in place are not seen.
+    # Bytes that are not utf-8 read as U+FFFD
+    def __init__(self, data: bytearray):
+        self.data = data
+        self._ascii: Optional[bytearray] = None
+        self._ascii_len = 0
+
+    def _isascii(self) -> bool:
+        data = self.data
+        if data is self._ascii and len(data) == self._ascii_len:
+            return True
+        if data.isascii():
+            self._ascii, self._ascii_len = data, len(data)
+            return True
+        return False
+
+    def _text(self) -> str:
+        return self.data.decode("utf-8", "replace")
+
+    def tounicode(self) -> str:
+        return self.data.decode("utf-8")
+
+    def fromunicode(self, s: str) -> None:
+        self.data += s.encode("utf-8")
+
+    def _replace(self, chars: List[str]) -> None:
+        self.data[:] = "".join(chars).encode("utf-8")
+        self._ascii = None
+
+    @overload
+    def __getitem__(self, i: int) -> str: ...
+    @overload
+    def __getitem__(self, s: slice) -> "CharBytesAdaptor": ...
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, "CharBytesAdaptor"]:
+        if self._isascii():
+            if isinstance(i, slice):
+                return self.__class__(self.data[i])
+            return chr(self.data[i])
+        text = self._text()
+        if isinstance(i, slice):
+            return self.__class__(bytearray(text[i].encode("utf-8")))
+        return text[i]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._text())
+
+    def __len__(self) -> int:
+        if self._isascii():
+            return len(self.data)
+        return len(self._text())
+
+    @overload
+    def __setitem__(self, index: int, item: str) -> None: ...
+    @overload
+    def __setitem__(self, index: slice, item: Iterable[str]) -> None: ...
+    def __setitem__(
+        self, index: Union[int, slice], item: Union[str, Iterable[str]]
+    ) -> None:
+        if isinstance(index, int) and isinstance(item, str):
+            if len(item) != 1:
+                raise TypeError("array item must be unicode character")
+            if item.isascii() and self._isascii():
+                self.data[index] = ord(item)
+                return
+            chars = list(self.tounicode())
+            chars[index] = item
+            self._replace(chars)
+        elif isinstance(index, slice) and isinstance(item, Iterable):
+            chars = list(self.tounicode())
+            chars[index] = item
+            self._replace(chars)
+        else:
+            raise TypeError()
+
+    def insert(self, index: int, item: str) -> None:
+        if len(item) != 1:
+            raise TypeError("array item must be unicode character")
+        if item.isascii() and self._isascii():
+            self.data.insert(index, ord(item))
+            self._ascii_len += 1
+            return
+        chars = list(self.tounicode())
+        chars.insert(index, item)
+        self._replace(chars)
+
+    def __delitem__(self, item: Union[int, slice]) -> None:
+        if self._isascii():
+            del self.data[item]
+            self._ascii_len = len(self.data)
+            return
+        chars = list(self.tounicode())
+        del chars[item]
+        self._replace(chars)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, CharBytesAdaptor):
+            return self.data == other.data
+        if isinstance(other, array.array) and other.typecode == "u":
+            # not a registered Sequence before python 3.10
+            try:
+                return self.tounicode() == other.tounicode()
+            except UnicodeDecodeError:
+                return False
+        if isinstance(other, (Sequence, array.array)):
+            if len(self) == len(other):
+                return all(a == b for a, b in zip(self, other))
+            else:
+                return False
+        return NotImplemented
+
+
+class LazyKObjAdaptor(BaseKObjMutSeq):
+    """General list whose elements are decoded from the receive buffer on first
+    access. spans holds the (start, end) offset of each undecoded element, the
+    buffer is released once every element has been materialised."""
+
+    def __init__(
+        self,
+        data: Union[bytes, bytearray],
+        spans: List[Tuple[int, int]],
+        decode: "Callable[[Union[bytes, bytearray], int], Tuple[KObj, int]]",
+    ):
+        self.data: Optional[Union[bytes, bytearray]] = data
+        self.spans = spans
+        self.decode = decode
+        self.items: "List[Optional[KObj]]" = [None] * len(spans)
+        self.pending = len(spans)
+
+    def _materialise(self, i: int) -> "KObj":
+        item = self.items[i]
+        if item is None:
+            assert self.data is not None
+            item, _ = self.decode(self.data, self.spans[i][0])
+            self.items[i] = item
+            self._decoded()
+        return item
+
+    def _decoded(self) -> None:
+        self.pending -= 1
+        if self.pending == 0:
+            self.data = None
+
+    def _materialise_all(self) -> "List[KObj]":
+        return [self._materialise(i) for i in range(len(self.items))]
+
+    def raw(self, i: int) -> Optional[memoryview]:
+        # wire encoding of an element not yet decoded, else None
+        if self.items[i] is not None or self.data is None:
+            return None
+        start, end = self.spans[i]
+        return memoryview(self.data)[start:end]
+
+    @overload
+    def __getitem__(self, i: int) -> "KObj": ...
+    @overload
+    def __getitem__(self, s: slice) -> "MutableSequence[KObj]": ...
+    def __getitem__(
+        self, i: Union[int, slice]
+    ) -> Union["KObj", "MutableSequence[KObj]"]:
+        if isinstance(i, slice):
+            return [self._materialise(j) for j in range(*i.indices(len(self.items)))]
+        if i < 0:
+            i += len(self.items)
+        if i < 0 or i >= len(self.items):
+            raise IndexError("list index out of range")
+        return self._materialise(i)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @overload
+    def __setitem__(self, index: int, item: "KObj") -> None: ...
+    @overload
+    def __setitem__(self, index: slice, item: "Iterable[KObj]") -> None: ...
+    def __setitem__(
+        self, index: Union[int, slice], item: "Union[KObj, Iterable[KObj]]"
+    ) -> None:
+        if isinstance(index, slice) and isinstance(item, Iterable):
+            items = self._materialise_all()
+            items[index] = item
+            self.items = list(items)
+            self.spans = [(-1, -1)] * len(items)
+        elif isinstance(index, int) and not isinstance(item, Iterable):
+            if self.items[index] is None:
+                self._decoded()
+            self.items[index] = item
+        else:
+            raise TypeError()
+
+    def insert(self, index: int, item: "KObj") -> None:
+        self.items.insert(index, item)
+        self.spans.insert(index, (-1, -1))
+
+    def __delitem__(self, item: Union[int, slice]) -> None:
+        if isinstance(item, slice):
+            self._materialise_all()
+        elif self.items[item] is None:
+            self._decoded()
+        del self.items[item]
+        del self.spans[item]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Sequence):
+            if len(self) == len(other):
+                return all(a == b for a, b in zip(self, other))
+            else:
+                return False
+        raise TypeError()
@@ -0,0 +1,31 @@
+import time
+from typing import Any, Callable, Dict
+
+# helpers shared by the benchmark modules, run as python -m aiokdb.bench.<name>
+
+
+def best_of(repeat: int, fn: Callable[[], Any]) -> float:
+    # fastest of repeat runs in seconds, the least disturbed by other load
+    best = float("inf")
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def environment() -> Dict[str, str]:
+    import platform
+
+    try:
+        from importlib.metadata import version
+
+        aiokdb = version("aiokdb")
+    except Exception:
+        aiokdb = "unknown"
+    return {
+        "aiokdb": aiokdb,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+    }
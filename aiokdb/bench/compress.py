@@ -0,0 +1,106 @@
+import argparse
+import json
+import random
+import sys
+from typing import Any, Dict, List, Tuple
+
+from aiokdb import TypeEnum, b9, kj, kk
+from aiokdb.bench import best_of, environment
+from aiokdb.compress import compress, decompress
+from aiokdb.extras import ktnf, ktni, ktns
+
+# compressed messages captured from kdb, as used by test_decompress
+CAPTURED = {
+    # 500#0j
+    "captured_500#0j": "0102010035000000ae0f0000c00700f401000000ff00ffff00ff00ff00ff00ff00ff00ff00ff00ff3f00ff00ff00ff00ff00ff008f",
+    # 500#12848484j
+    "captured_500#12848484j": "0102010052000000ae0f0000000700f4010000640dfec40000000169ffc9ffc4ff00010000ff69ffc9ffc4ff0000000169ffc9ffc4ffff0001000069ffc9ffc4ff0000000169ff1fc9ffc4ff00010000696e",
+    # (200#12848484j),300#3456
+    "captured_mixed_longs": "010201005f000000ae0f0000000700f4010000640dfec40000000169ffc9ffc4ff000100003f69ffc9ffc4ff000000016926800dff000100018dff0dff000100018dff0dffff000100018dff0dff000100018dff0dff0f000100018dff0d35",
+}
+
+
+def payloads(n: int, seed: int = 0) -> List[Tuple[str, bytes]]:
+    # message bodies, without the 8 byte header, of about 8n bytes each
+    rng = random.Random(seed)
+
+    ts = 788918400000000000
+    times = []
+    for i in range(n):
+        ts += rng.randrange(0, 50) * 1000000  # millisecond ticks
+        times.append(ts)
+    timestamps = ktni(TypeEnum.KP, *times)
+
+    names = [f"sym{i}" for i in range(100)]
+    symbols = ktns(*[rng.choice(names) for i in range(n)])
+
+    floats = ktnf(TypeEnum.KF, *[rng.random() for i in range(n)])
+    prices = ktnf(TypeEnum.KF, *[round(100 + rng.random(), 2) for i in range(n)])
+
+    # like the compress.__main__ fuzzer: zeros patched with some random bytes
+    sparse = bytearray(8 * n)
+    for i in range(n // 4):
+        sparse[rng.randrange(1, len(sparse))] = rng.randrange(0, 255)
+
+    bodies = [
+        ("timestamps_sorted", b9(timestamps)[8:]),
+        ("symbols_repeated", b9(symbols)[8:]),
+        ("floats_random", b9(floats)[8:]),
+        ("floats_prices", b9(prices)[8:]),
+        ("bytes_sparse", bytes(sparse)),
+        ("longs_zero", b9(ktni(TypeEnum.KJ, *([0] * n)))[8:]),
+        ("mixed_list", b9(kk(*[kj(i % 7) for i in range(n // 8)]))[8:]),
+    ]
+    for name, hx in CAPTURED.items():
+        bodies.append((name, decompress(bytes.fromhex(hx)[8:])))
+    return bodies
+
+
+def measure(name: str, body: bytes, repeat: int) -> Dict[str, Any]:
+    size = len(body)
+    compressed = compress(body)
+    result: Dict[str, Any] = {
+        "payload": name,
+        "bytes": size,
+        "compressed_bytes": None if compressed is None else len(compressed),
+        "ratio": 1.0 if compressed is None else round(len(compressed) / size, 4),
+    }
+    seconds = best_of(repeat, lambda: compress(body))
+    result["compress_mb_s"] = round(size / seconds / 1e6, 3)
+    if compressed is not None:
+        if decompress(compressed) != body:
+            raise Exception(f"{name} did not round trip")
+        seconds = best_of(repeat, lambda: decompress(compressed))
+        result["decompress_mb_s"] = round(size / seconds / 1e6, 3)
+    else:
+        result["decompress_mb_s"] = None
+    return result
+
+
+def main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m aiokdb.bench.compress",
+        description="compress() and decompress() throughput, printed as JSON",
+    )
+    parser.add_argument("--elements", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = [
+        measure(name, body, args.repeat)
+        for name, body in payloads(args.elements, args.seed)
+    ]
+    report = {
+        "benchmark": "compress",
+        "environment": environment(),
+        "elements": args.elements,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,275 @@
+import argparse
+import json
+import random
+import sys
+import tracemalloc
+import uuid
+from typing import Any, Callable, Dict, List, Tuple
+
+from aiokdb import (
+    VECTOR_CONSTUCTORS,
+    KObj,
+    TypeEnum,
+    b9,
+    cv,
+    d9,
+    kf,
+    kj,
+    kk,
+    ks,
+    ktn,
+    xd,
+    xt,
+)
+from aiokdb.bench import best_of, environment
+from aiokdb.extras import ktnb, ktnf, ktni, ktns, ktnu
+
+# payload generators take (n, rng) and give (KObj, elements), elements being
+# the count used to normalise timings: vector length, or cells of a table
+Generator = Callable[[int, random.Random], Tuple[KObj, int]]
+
+# inclusive ranges of random values for the integer vector types, kept clear
+# of the null and infinity values at each end
+_INT_RANGES = {
+    TypeEnum.KG: (0, 255),
+    TypeEnum.KH: (-32000, 32000),
+    TypeEnum.KI: (-(2**31) + 2, 2**31 - 2),
+    TypeEnum.KJ: (-(2**63) + 2, 2**63 - 2),
+    TypeEnum.KP: (0, 10**18),
+    TypeEnum.KN: (0, 86400 * 10**9),
+    TypeEnum.KM: (0, 1200),
+    TypeEnum.KD: (0, 20000),
+    TypeEnum.KU: (0, 1439),
+    TypeEnum.KV: (0, 86399),
+    TypeEnum.KT: (0, 86399999),
+}
+
+
+def _names(count: int) -> List[str]:
+    return [f"sym{i}" for i in range(count)]
+
+
+def vector(t: TypeEnum, n: int, rng: random.Random) -> KObj:
+    # a vector of n random values of type t, for any type but K
+    if t in _INT_RANGES:
+        lo, hi = _INT_RANGES[t]
+        return ktni(t, *[rng.randint(lo, hi) for i in range(n)])
+    elif t == TypeEnum.KB:
+        return ktnb(*[rng.random() < 0.5 for i in range(n)])
+    elif t in (TypeEnum.KF, TypeEnum.KZ):
+        v = ktn(t)
+        v.kF().extend(rng.random() for i in range(n))
+        return v
+    elif t == TypeEnum.KE:
+        return ktnf(t, *[rng.random() for i in range(n)])
+    elif t == TypeEnum.KS:
+        names = _names(100)
+        return ktns(*[rng.choice(names) for i in range(n)])
+    elif t == TypeEnum.UU:
+        return ktnu(*[uuid.UUID(int=rng.getrandbits(128)) for i in range(n)])
+    elif t == TypeEnum.KC:
+        return cv("".join(rng.choice("abcdefgh ") for i in range(n)))
+    raise ValueError(f"no generator for vector type {t.name}")
+
+
+def _vector_case(t: TypeEnum) -> Generator:
+    return lambda n, rng: (vector(t, n, rng), n)
+
+
+def mixed_list(n: int, rng: random.Random) -> Tuple[KObj, int]:
+    # general list of atoms and short strings, as a function call's arguments
+    makers: List[Callable[[int], KObj]] = [
+        kj,
+        lambda i: kf(i / 7),
+        lambda i: ks(f"s{i % 50}"),
+        lambda i: cv(f"str{i}"),
+    ]
+    return kk(*[rng.choice(makers)(i) for i in range(n)]), n
+
+
+def dictionary(n: int, rng: random.Random) -> Tuple[KObj, int]:
+    return xd(ktns(*_names(n)), vector(TypeEnum.KJ, n, rng)), n
+
+
+def _table(columns: Dict[str, KObj]) -> KObj:
+    return xt(xd(ktns(*columns), kk(*columns.values())))
+
+
+def table_long(n: int, rng: random.Random) -> Tuple[KObj, int]:
+    # trade-like table of n rows
+    columns = {
+        "time": vector(TypeEnum.KP, n, rng),
+        "sym": vector(TypeEnum.KS, n, rng),
+        "price": vector(TypeEnum.KF, n, rng),
+        "size": vector(TypeEnum.KI, n, rng),
+        "id": vector(TypeEnum.UU, n, rng),
+    }
+    return _table(columns), 5 * n
+
+
+def table_wide(n: int, rng: random.Random) -> Tuple[KObj, int]:
+    # many columns of a few rows, n cells in all
+    types = [TypeEnum.KJ, TypeEnum.KF, TypeEnum.KS, TypeEnum.KB, TypeEnum.KD]
+    width = max(1, min(n, 500))
+    rows = max(1, n // width)
+    columns = {f"c{i}": vector(types[i % len(types)], rows, rng) for i in range(width)}
+    return _table(columns), width * rows
+
+
+def symbols_unique(n: int, rng: random.Random) -> Tuple[KObj, int]:
+    # every symbol distinct, so each one is interned on decode
+    names = _names(n)
+    rng.shuffle(names)
+    return ktns(*names), n
+
+
+def table_symbols(n: int, rng: random.Random) -> Tuple[KObj, int]:
+    # reference data: sym columns of low and high cardinality
+    many = _names(max(1, n // 2))
+    columns = {
+        "sym": vector(TypeEnum.KS, n, rng),
+        "exch": ktns(*[rng.choice(["N", "O", "L", "P"]) for i in range(n)]),
+        "account": ktns(*[rng.choice(many) for i in range(n)]),
+        "desk": ktns(*[rng.choice(_names(10)) for i in range(n)]),
+    }
+    return _table(columns), 4 * n
+
+
+def cases() -> Dict[str, Generator]:
+    generators: Dict[str, Generator] = {
+        t.name: _vector_case(t) for t in VECTOR_CONSTUCTORS if t != TypeEnum.K
+    }
+    generators.update(
+        {
+            "mixed_list": mixed_list,
+            "dictionary": dictionary,
+            "table_long": table_long,
+            "table_wide": table_wide,
+            "symbols_unique": symbols_unique,
+            "table_symbols": table_symbols,
+        }
+    )
+    return generators
+
+
+def allocations(fn: Callable[[], Any]) -> Tuple[int, int]:
+    # (retained blocks, peak bytes) of fn: the blocks still alive afterwards, ie.
+    # making up its result, and the most traced at once, temporaries included
+    tracemalloc.start()
+    try:
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    return blocks, peak
+
+
+def measure(
+    name: str, size: int, generator: Generator, repeat: int, seed: int
+) -> Dict[str, Any]:
+    k, elements = generator(size, random.Random(seed))
+    data = b9(k)
+    if d9(data) != k:
+        raise Exception(f"{name} did not round trip")
+
+    encode = best_of(repeat, lambda: b9(k))
+    decode = best_of(repeat, lambda: d9(data))
+    encode_blocks, encode_peak = allocations(lambda: b9(k))
+    decode_blocks, decode_peak = allocations(lambda: d9(data))
+    return {
+        "case": name,
+        "size": size,
+        "elements": elements,
+        "bytes": len(data),
+        "encode_ns": round(encode * 1e9 / elements, 2),
+        "decode_ns": round(decode * 1e9 / elements, 2),
+        "encode_retained_blocks": encode_blocks,
+        "encode_peak_bytes": encode_peak,
+        "decode_retained_blocks": decode_blocks,
+        "decode_peak_bytes": decode_peak,
+    }
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float
+) -> List[Dict[str, Any]]:
+    # annotate results with their time relative to the baseline run, returning
+    # those slower by more than tolerance
+    before = {(r["case"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = before.get((r["case"], r["size"]))
+        if old is None:
+            continue
+        for metric in ("encode_ns", "decode_ns"):
+            if not old[metric]:
+                continue
+            ratio = round(r[metric] / old[metric], 3)
+            r[f"{metric}_vs_baseline"] = ratio
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    {
+                        "case": r["case"],
+                        "size": r["size"],
+                        "metric": metric,
+                        "ratio": ratio,
+                    }
+                )
+    return regressions
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m aiokdb.bench.serialize",
+        description="b9() and d9() ns/element and memory, printed as JSON",
+    )
+    parser.add_argument("--sizes", default="10,1000,100000", help="comma separated")
+    parser.add_argument("--cases", default=None, help="comma separated, default all")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", default=None, help="also write results to file")
+    parser.add_argument("--baseline", default=None, help="results file to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    generators = cases()
+    names = list(generators) if args.cases is None else args.cases.split(",")
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    results = [
+        measure(name, size, generators[name], args.repeat, args.seed)
+        for name in names
+        for size in sizes
+    ]
+    report: Dict[str, Any] = {
+        "benchmark": "serialize",
+        "environment": environment(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    regressions: List[Dict[str, Any]] = []
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        report["baseline"] = {
+            "file": args.baseline,
+            "environment": baseline.get("environment"),
+            "tolerance": args.tolerance,
+            "regressions": regressions,
+        }
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
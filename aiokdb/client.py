@@ -1,11 +1,14 @@
 import argparse
 import asyncio
+import concurrent.futures
 import logging
 import struct
 from typing import Any, Optional, Tuple
 from urllib.parse import urlparse, urlunparse
 
 from aiokdb import cv, logger
+from aiokdb.compress import CompressionPolicy
+from aiokdb.protocol import KContextScope
 from aiokdb.server import (
     BaseContext,
     CredentialsException,
@@ -31,6 +34,9 @@ async def open_qipc_connection(
     uri: Optional[str] = None,
     context: Optional[ClientContext] = None,
     ver: int = 3,
+    compression: Optional[CompressionPolicy] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+    kcontext: Optional[KContextScope] = None,
 ) -> Tuple[KdbReader, KdbWriter]:
     if uri:  #  uri takes precedence if provided
         pr = urlparse(uri)
@@ -63,8 +69,10 @@ async def open_qipc_connection(
     except asyncio.IncompleteReadError as e:
         raise CredentialsException(e)
 
-    q_reader = KdbReader(reader)
-    q_writer = KdbWriter(writer, q_reader, version=remote_ver, context=context)
+    q_reader = KdbReader(reader, executor=executor, kcontext=kcontext)
+    q_writer = KdbWriter(
+        writer, q_reader, version=remote_ver, context=context, compression=compression
+    )
     if context is not None:
         task = asyncio.create_task(reader_to_context_task(q_writer, q_reader, context))
         background_tasks.add(task)
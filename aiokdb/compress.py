@@ -3,6 +3,7 @@ import logging
 import random
 import struct
 import sys
+import time
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -24,56 +25,60 @@ def decompress(data: bytes) -> bytes:
     # After each operation, update the hashpos table provided we have at least 2 bytes output, and using no more
     # than two bytes from the history copy
 
+    # History copies use slice assignment, or replicate the repeating pattern when
+    # the source overlaps the bytes being written. A control byte of zero (eight
+    # literals) is copied as one slice.
+    # Between operations p, the next position to hash, is always s-1 or s. That is
+    # why at most two hash updates follow each operation.
+
     dst = bytearray(uncomp_sz)
     hashpos = [0] * 256
     d = 4  # position index into compressed data[]
     s = 0  # write position in dst[] (uncompressed output)
     p = 0  # hash  position in dst[] for hashpos updates
-    f = 0  # current instruction byte, examined bit by bit
-    i = 0  # bit position within f as a 1-hot value, ie. 1,2,4,8,16,32,64,128
 
     while s < uncomp_sz:
-        if i == 0:
-            # out of instruction bits! reload f, reset i, advance d
-            # print(f"loading next 8 instructions from d={d}")
-            f = data[d]
-            d += 1
-            i = 1
-
-        # check bit i of f
-        if f & i:  # bit set: copy history range
-            # {ptr}{sz} copy n bytes (sz+2) from uncompressed history pointer r (ptr)
-            r = hashpos[data[d]]
-            n = data[d + 1]
-            # print(f"instr {i} hist d={d} slot {data[d]}, copy pos={r} len={2+n} to {s}")
-            # DO NOT USE SLICE ASSIGNMENT HERE, AS A HISTORY REFERENCE CAN COPY OWN OUTPUT
-            # ie. start 8 bytes back and copy 64 bytes, gives 8x repeating 8 bytes
-            for m in range(2 + n):
-                dst[s + m] = dst[r + m]
-            d += 2
-            s += 2
-
-        else:  # copy 1 byte from compressed stream to uncomp
-            # print(f"instr {i} literal d={d} value {data[d:d+1].hex()} to pos {s}")
-            dst[s] = data[d]
-            n = 0
-            d += 1
-            s += 1
+        f = data[d]  # next 8 instructions, examined from the least significant bit
+        d += 1
 
-        while p < s - 1:
-            hashv = dst[p] ^ dst[p + 1]
-            # print(f" hash slot {hashv} set to p={p}")
-            hashpos[hashv] = p
-            p += 1
+        if f == 0 and s + 8 <= uncomp_sz:
+            dst[s : s + 8] = data[d : d + 8]
+            d += 8
+            s += 8
+            for q in range(p, s - 1):
+                hashpos[dst[q] ^ dst[q + 1]] = q
+            p = s - 1
+            continue
 
-        # only first two bytes of a copied range are used to update the hash
-        # jump s and p over the remaining copied range (n)
-        s += n
-        if f & i:
-            p = s
+        for i in (1, 2, 4, 8, 16, 32, 64, 128):
+            if s >= uncomp_sz:
+                break
+            if f & i:
+                # {ptr}{sz} copy sz+2 bytes from uncompressed history pointer
+                r = hashpos[data[d]]
+                n = 2 + data[d + 1]
+                d += 2
+                if r + n <= s:
+                    dst[s : s + n] = dst[r : r + n]
+                else:
+                    # starts within n bytes back, so repeats dst[r:s]
+                    dst[s : s + n] = (dst[r:s] * (n // (s - r) + 1))[:n]
+                # only first two bytes of a copied range are used to update the hash
+                if p < s:
+                    hashpos[dst[p] ^ dst[s]] = p
+                hashpos[dst[s] ^ dst[s + 1]] = s
+                s += n
+                p = s
+            else:
+                dst[s] = data[d]
+                d += 1
+                if p < s:
+                    hashpos[dst[p] ^ dst[s]] = p
+                p = s
+                s += 1
 
-        # next control bit
-        i = (i << 1) & 255
+    if len(dst) != uncomp_sz:
+        raise ValueError(f"decompressed {len(dst)} bytes, expected {uncomp_sz}")
 
     # Note that cpython is overly restrictive in the uuid.UUID(bytes=...) call and will not
     # allow a bytearray, so now decompression is done convert it once to immutable bytes object.
@@ -81,88 +86,159 @@ def decompress(data: bytes) -> bytes:
     return bytes(dst)
 
 
+# inputs at least this large are sampled before being compressed in full
+_SAMPLE_FROM = 65536
+_SAMPLE_WINDOW = 2048
+
+
 def compress(y: bytes) -> Optional[bytes]:
     # if data is not worth compressing return None, else compressed payload
     if len(y) < 8:
         return None
+    if len(y) >= _SAMPLE_FROM and not _worth_compressing(y):
+        logger.debug(f"compressor: {len(y)} bytes not worth compressing (sampled)")
+        return None
+    return _compress(y, len(y) // 2)
+
 
-    wr = bytearray(len(y) // 2)
+def _worth_compressing(y: bytes) -> bool:
+    # compress evenly spaced windows, 1/8th of the input at most, and give up
+    # if they come to over 3/4 of their size, since the whole must halve
+    n = min(16, len(y) // (8 * _SAMPLE_WINDOW))
+    sampled = 0
+    out = 0
+    for k in range(n):
+        start = k * (len(y) - _SAMPLE_WINDOW) // (n - 1)
+        window = y[start : start + _SAMPLE_WINDOW]
+        bs = _compress(window, len(window))
+        sampled += len(window)
+        out += len(window) if bs is None else len(bs)
+    return out <= sampled * 3 // 4
+
+
+def _compress(y: bytes, cap: int) -> Optional[bytes]:
+    # None once the output would not fit in cap bytes
+    wr = bytearray(cap)
+    limit = cap - 17  # room for one more group: 8x2 data + 1 flags
 
-    i = 128  # bit position within f as a 1-hot value, ie. 1,2,4,8,16,32,64,128
-    f = 0  # current flags
     h0 = 0
     h = 0
     p = 0
     s0 = 0
     s = 0  # read position in uncompressed y
     t = len(y)
+    t2 = t - 2  # positions with two bytes left to hash
     a = [0] * 256  # hash buckets
 
     struct.pack_into("I", wr, 0, len(y) + 8)
     d = 4  # write position into wr
-    c = 4  # last flags position into wr (sentinal first loop, written to twice)
 
     while s < t:
-        i *= 2
-        if i == 256:
-            # print(f"flushing flags wBuf[{c}]={f} writepos={d}")
-            if d > len(wr) - 17:  # 8x2 data + 1 flags
-                logger.debug(
-                    f"compressor: {len(y)} bytes not worth compressing (writepos {d})"
-                )
-                return None
-            i = 1
-            wr[c] = f  # write back flags
-            c = d
-            d += 1
-            f = 0
+        if d > limit:
+            logger.debug(
+                f"compressor: {len(y)} bytes not worth compressing (writepos {d})"
+            )
+            return None
+        c = d  # flags position, written back once the group of 8 is done
+        d += 1
+        f = 0
 
-        # h0, s0 are hash and position writeback?
-        # h current hash
-        if s > t - 3:
-            literal = True
-        else:
-            h = y[s] ^ y[s + 1]
-            p = a[h]
-            # quirk: it doesn't check y[s+1]==y[p+1]. Since h is over two bytes,
-            # if hash matches and y[s]==y[p], it cannot be a collision
-            literal = (0 == p) or (y[s] != y[p])
-
-        # print(f"operation literal={literal} writepos={d} readpos={s}")
-        if 0 < s0:
-            a[h0] = s0
-            s0 = 0
-
-        if literal:
-            # write back the (possibly updated) backref for this hash
+        for i in (1, 2, 4, 8, 16, 32, 64, 128):
+            if s >= t:
+                break
+
+            # h0, s0 are hash and position writeback?
+            # h current hash, left unchanged for the last two bytes
+            ys = y[s]
+            if s < t2:
+                h = ys ^ y[s + 1]
+                p = a[h]
+                # quirk: it doesn't check y[s+1]==y[p+1]. Since h is over two bytes,
+                # if hash matches and y[s]==y[p], it cannot be a collision
+                if p and ys == y[p]:
+                    if s0:
+                        a[h0] = s0
+                        s0 = 0
+                    a[h] = s
+                    f |= i
+                    p += 2
+                    s += 2
+                    # match length, up to 255 and stopping a byte short of the end
+                    m = (t if t < s + 255 else s + 255) - 1 - s
+                    n = 0
+                    k = m if m < 16 else 16
+                    while n < k and y[p + n] == y[s + n]:
+                        n += 1
+                    if n == 16 and m > 16:
+                        # long run, compare slices rather than bytes
+                        if y[p : p + m] == y[s : s + m]:
+                            n = m
+                        else:
+                            # y[p:p+lo] matches, y[p:p+hi] does not
+                            lo, hi = 16, m
+                            while hi - lo > 1:
+                                mid = (lo + hi) // 2
+                                if y[p : p + mid] == y[s : s + mid]:
+                                    lo = mid
+                                else:
+                                    hi = mid
+                            n = lo
+                    wr[d] = h
+                    wr[d + 1] = n
+                    d += 2
+                    s += n
+                    continue
+
+            # literal: write back the previous literal's backref, deferred until
+            # this position's bucket has been read, then cp the byte. f flag clear
+            if s0:
+                a[h0] = s0
             h0 = h
             s0 = s
-            # cp the literal. f flag already clear
-            wr[d] = y[s]
+            wr[d] = ys
             d += 1
             s += 1
-        else:
-            a[h] = s
-            f |= i
-            p += 2
-            s += 2
-            # test match length
-            r = s
-            q = min(s + 255, t) - 1
-            # print(f"flags now {f} maxlen {q}")
-            while y[p] == y[s] and s < q:
-                p += 1
-                s += 1
-            # print(f'  runlength {s-r}')
-            wr[d + 0] = h
-            wr[d + 1] = s - r
-            d += 2
 
-    wr[c] = f  # flush flags
+        wr[c] = f  # flush flags
+
     logger.debug(f"compressor: {len(y)} uncompressed bytes down to {d} bytes")
     return bytes(wr[0:d])
 
 
+class CompressionPolicy:
+    """Opt-in compression of outgoing messages, matching kdb+: messages larger than
+    threshold bytes are compressed, unless the peer is on localhost, and sent as is
+    when compress() finds them not worth it. Counters accumulate over every writer
+    sharing the policy."""
+
+    def __init__(self, threshold: int = 2000, localhost: bool = False) -> None:
+        self.threshold = threshold
+        self.localhost = localhost  # also compress to peers on this host
+        self.compressed = 0  # messages sent compressed
+        self.incompressible = 0  # messages over the threshold sent as is
+        self.bytes_in = 0  # payload bytes given to compress()
+        self.bytes_out = 0  # bytes sent for them
+        self.seconds = 0.0  # time spent in compress()
+
+    @property
+    def ratio(self) -> float:
+        # bytes sent per payload byte, over messages big enough to try
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+
+    def compress(self, payload: bytes) -> Optional[bytes]:
+        start = time.perf_counter()
+        out = compress(payload)
+        self.seconds += time.perf_counter() - start
+        self.bytes_in += len(payload)
+        if out is None:
+            self.incompressible += 1
+            self.bytes_out += len(payload)
+        else:
+            self.compressed += 1
+            self.bytes_out += len(out)
+        return out
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--debug", action="store_true")
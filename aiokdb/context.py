@@ -1,24 +1,218 @@
-from typing import Dict, List
+import array
+import collections
+import contextlib
+import itertools
+import threading
+from typing import Any, ContextManager, Dict, Iterable, List, Optional, Sequence
 
 
 class KContext:
-    def __init__(self) -> None:
+    """Enumeration of the symbols used by the KObjs created with it, which hold
+    symbols as int indexes.
+
+    By default symbols are kept forever. When many distinct symbols pass through,
+    eg. order ids sent as symbols, either decode each connection or message into
+    its own context, dropped along with its objects, or reclaim symbols by age:
+    with max_age set, each call to advance() starts a new generation and symbols
+    neither interned nor looked up (read as text, or encoded) during the last
+    max_age generations are removed, their indexes being reused. The caller must
+    then not keep objects whose symbols go unused for longer, as their indexes
+    may come to name other symbols."""
+
+    def __init__(self, max_age: Optional[int] = None) -> None:
+        if max_age is not None and max_age < 1:
+            raise ValueError("max_age must be at least 1")
         self.symbols: Dict[str, int] = {}
         self._symbol_str: List[str] = []
         self._symbol_bytes: List[bytes] = []
+        # utf-8 encoded symbol (without null terminator) to index, lets wire
+        # symbols be interned without decoding them
+        self._symbol_raw: Dict[bytes, int] = {}
+        # held to add symbols, since messages may be decoded on executor threads,
+        # and with max_age set for all access, so none races a reclaim
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.max_age = max_age
+        self.generation = 0
+        # generation each index was last interned in, -1 once reclaimed
+        self._touched: List[int] = []
+        self._free: List[int] = []
 
     def ss(self, s: str) -> int:
+        if self.max_age is None:
+            idx = self.symbols.get(s)
+            if idx is not None:
+                self.hits += 1
+                return idx
         if not isinstance(s, str):
             raise TypeError("Can only enumerate strings")
-        idx = self.symbols.setdefault(s, len(self.symbols))
-        if idx == len(self._symbol_str):
-            bs = bytes(s, "utf-8") + b"\x00"
-            self._symbol_bytes.append(bs)
-            self._symbol_str.append(s)
+        with self._lock:
+            idx = self.symbols.get(s)
+            if idx is not None:
+                self.hits += 1
+                self._touched[idx] = self.generation
+                return idx
+            self.misses += 1
+            # publish to the lookup dicts last, as they are read without the lock
+            raw = bytes(s, "utf-8")
+            if self._free:
+                idx = self._free.pop()
+                self._symbol_bytes[idx] = raw + b"\x00"
+                self._symbol_str[idx] = s
+                self._touched[idx] = self.generation
+            else:
+                idx = len(self._symbol_str)
+                self._symbol_bytes.append(raw + b"\x00")
+                self._symbol_str.append(s)
+                self._touched.append(self.generation)
+            self._symbol_raw[raw] = idx
+            self.symbols[s] = idx
         return idx
 
+    def ss_many(self, ss: Iterable[str]) -> "array.array[int]":
+        # intern a batch of symbols, the new ones one at a time through ss() and
+        # the rest, including repeats, as a single dict probe each
+        if not isinstance(ss, (list, tuple)):
+            ss = list(ss)
+        symbols = self.symbols
+        touched = self._touched
+        with self._batch_lock():
+            generation = self.generation
+            distinct = 0
+            for s in dict.fromkeys(ss):
+                distinct += 1
+                idx = symbols.get(s)
+                if idx is None:
+                    self.ss(s)
+                else:
+                    self.hits += 1
+                    touched[idx] = generation
+            self.hits += len(ss) - distinct
+            return array.array("i", map(symbols.__getitem__, ss))
+
+    def ss_bytes(self, raw: bytes) -> int:
+        # intern one utf-8 encoded symbol, decoding it only when first seen
+        if self.max_age is None:
+            idx = self._symbol_raw.get(raw)
+            if idx is not None:
+                self.hits += 1
+                return idx
+        with self._lock:
+            idx = self._symbol_raw.get(raw)
+            if idx is None:
+                return self.ss(raw.decode("utf-8"))
+            self.hits += 1
+            self._touched[idx] = self.generation
+            return idx
+
+    def ss_bytes_many(self, raws: Sequence[bytes]) -> "array.array[int]":
+        # intern a batch of utf-8 encoded symbols, only decoding those not seen
+        # before, so repeated symbols are a single dict probe each
+        cache = self._symbol_raw
+        touched = self._touched
+        with self._batch_lock():
+            generation = self.generation
+            distinct = 0
+            for raw in dict.fromkeys(raws):
+                distinct += 1
+                idx = cache.get(raw)
+                if idx is None:
+                    self.ss(raw.decode("utf-8"))
+                else:
+                    self.hits += 1
+                    touched[idx] = generation
+            self.hits += len(raws) - distinct
+            return array.array("i", map(cache.__getitem__, raws))
+
+    def _batch_lock(self) -> ContextManager[Any]:
+        # batches are held against a reclaim when reclaiming by age, otherwise
+        # only new symbols take the lock, in ss(), so that decoding on another
+        # thread does not hold up interning here
+        if self.max_age is None:
+            return contextlib.nullcontext()
+        return self._lock
+
+    # lookups count as use when reclaiming by age, so symbols of objects still
+    # being read or encoded are kept
     def lookup_str(self, idx: int) -> str:
+        if self.max_age is not None:
+            self._touch([idx])
         return self._symbol_str[idx]
 
     def lookup_bytes(self, idx: int) -> bytes:
+        if self.max_age is not None:
+            self._touch([idx])
         return self._symbol_bytes[idx]
+
+    def lookup_many(self, idxs: Iterable[int]) -> List[str]:
+        if self.max_age is not None:
+            idxs = self._touch(idxs)
+        return list(map(self._symbol_str.__getitem__, idxs))
+
+    def lookup_bytes_many(self, idxs: Iterable[int]) -> bytes:
+        # null terminated symbols concatenated, as sent on the wire
+        if self.max_age is not None:
+            idxs = self._touch(idxs)
+        return b"".join(map(self._symbol_bytes.__getitem__, idxs))
+
+    def _touch(self, idxs: Iterable[int]) -> Sequence[int]:
+        # mark idxs used in this generation, giving them back as a sequence
+        if not isinstance(idxs, Sequence):
+            idxs = list(idxs)
+        with self._lock:
+            # assigns in C, consuming the map without a python loop
+            setter = self._touched.__setitem__
+            generation = itertools.repeat(self.generation)
+            collections.deque(map(setter, idxs, generation), maxlen=0)
+        return idxs
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def hit_rate(self) -> float:
+        # fraction of interned symbols that were already known
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self.symbols),
+            "capacity": len(self._symbol_str),
+            "free": len(self._free),
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def advance(self) -> int:
+        # start a new generation, eg. per message or batch handled, returning the
+        # count of symbols reclaimed. Aged symbols are swept every max_age
+        # generations, so are reclaimed between max_age and 2*max_age old
+        with self._lock:
+            self.generation += 1
+            if self.max_age is None or self.generation % self.max_age:
+                return 0
+            return self._reclaim(self.generation - self.max_age)
+
+    def _reclaim(self, before: int) -> int:
+        # remove symbols last used before generation `before`, lock held
+        touched = self._touched
+        reclaimed = 0
+        for idx in range(len(touched)):
+            # free indexes may be touched by lookups of stale objects
+            if 0 <= touched[idx] < before and self._symbol_bytes[idx]:
+                s = self._symbol_str[idx]
+                del self.symbols[s]
+                del self._symbol_raw[self._symbol_bytes[idx][:-1]]
+                self._symbol_str[idx] = ""
+                self._symbol_bytes[idx] = b""
+                touched[idx] = -1
+                self._free.append(idx)
+                reclaimed += 1
+            elif touched[idx] >= 0 and not self._symbol_bytes[idx]:
+                touched[idx] = -1
+        return reclaimed
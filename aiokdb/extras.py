@@ -26,10 +26,7 @@ def ktni(t: TypeEnum, *ints: int) -> KObj:
 
 
 def ktns(*ss: str) -> KObj:
-    v = ktn(TypeEnum.KS)
-    for s in ss:
-        v.appendS(s)
-    return v
+    return ktn(TypeEnum.KS).appendS(*ss)
 
 
 def ktnu(*uuids: uuid.UUID) -> KObj:
@@ -21,7 +21,8 @@ def ktofile(k: KObj, filename: PathLike) -> None:
     # or are sent a signal mid-write. Write to a temporary file and then rename once
     # closed
     temporary_filename = f"{filename}$"
+    buf = bytearray(b"\xff\x01")
+    k._encode(buf)
     with open(temporary_filename, "wb") as f:
-        f.write(b"\xff\x01")
-        f.write(k._databytes())
+        f.write(buf)
     os.rename(temporary_filename, filename)
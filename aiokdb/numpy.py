@@ -0,0 +1,193 @@
+from typing import Any, Dict, Optional, Tuple, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from aiokdb import (
+    DEFAULT_CONTEXT,
+    Infs,
+    KObj,
+    Nulls,
+    TypeEnum,
+    _column_storage,
+    ktn,
+)
+from aiokdb.adapter import UUIDBytesAdaptor
+from aiokdb.context import KContext
+
+# Conversion between vectors and numpy arrays, only importable when numpy is
+# installed. view() shares the vector storage, to_numpy() also converts symbols
+# to str and temporal types to datetime64/timedelta64, from_numpy() builds a
+# vector from an array's buffer.
+#
+#    view(k)         zero copy, numeric and temporal as stored, bool, S1, V16
+#    to_numpy(k)     view(k), or a converted copy for symbol and temporal types
+#    from_numpy(a)   vector of the type matching a.dtype, or of type t given
+
+# unit of the numpy type of each temporal type, values of the first group
+# being offset from 2000.01.01
+_DATETIMES: Dict[int, str] = {
+    TypeEnum.KP: "ns",
+    TypeEnum.KM: "M",
+    TypeEnum.KD: "D",
+    TypeEnum.KZ: "ms",
+}
+_TIMEDELTAS: Dict[int, str] = {
+    TypeEnum.KN: "ns",
+    TypeEnum.KU: "m",
+    TypeEnum.KV: "s",
+    TypeEnum.KT: "ms",
+}
+_EPOCH = np.datetime64("2000-01-01")
+
+_MS_PER_DAY = 86400000.0
+
+# vector types end here, including enumerations (20-76) which are stored as
+# longs. Types from 77 are mapped lists, tables, dicts and functions
+_VECTOR_TYPE_END = 77
+
+# vector type of each (dtype.kind, itemsize)
+_INFER: Dict[Tuple[str, int], TypeEnum] = {
+    ("b", 1): TypeEnum.KB,
+    ("u", 1): TypeEnum.KG,
+    ("i", 2): TypeEnum.KH,
+    ("i", 4): TypeEnum.KI,
+    ("i", 8): TypeEnum.KJ,
+    ("f", 4): TypeEnum.KE,
+    ("f", 8): TypeEnum.KF,
+    ("S", 1): TypeEnum.KC,
+    ("V", 16): TypeEnum.UU,
+}
+
+
+def _epoch(unit: str) -> int:
+    # 2000.01.01 as a count of unit since 1970.01.01
+    return int(_EPOCH.astype(f"datetime64[{unit}]").astype(np.int64))
+
+
+def _infer(dtype: "np.dtype[Any]") -> TypeEnum:
+    if dtype.kind in "UO":
+        return TypeEnum.KS
+    elif dtype.kind == "M":
+        unit = np.datetime_data(dtype)[0]
+        return {"D": TypeEnum.KD, "M": TypeEnum.KM}.get(unit, TypeEnum.KP)
+    elif dtype.kind == "m":
+        return TypeEnum.KN
+    t = _INFER.get((dtype.kind, dtype.itemsize))
+    if t is None:
+        raise ValueError(f"no vector type for dtype {dtype}, pass one as t")
+    return t
+
+
+def view(k: KObj) -> "npt.NDArray[Any]":
+    # array over the vector's storage, writes going through to the vector,
+    # which cannot be resized while the array exists. Temporal types give
+    # their integers (floats for KZ), booleans give bool, chars S1 and GUIDs V16
+    t = k.t
+    if t == TypeEnum.UU:
+        return np.frombuffer(cast(UUIDBytesAdaptor, k.kU()).data, dtype="V16")
+    elif t == TypeEnum.KC:
+        return np.frombuffer(k.kC().data, dtype="S1")
+    elif t == TypeEnum.KS:
+        raise ValueError("symbols are not stored as text, use to_numpy")
+    elif not 0 < t < _VECTOR_TYPE_END:
+        raise ValueError(f"no numpy view of {k._tn()}")
+    storage = _column_storage(k)
+    a = np.frombuffer(storage, dtype=np.dtype(_typecode(storage)))
+    return a.view(np.bool_) if t == TypeEnum.KB else a
+
+
+def _typecode(storage: Any) -> str:
+    # arrays give their typecode, memoryviews of KVectorView their format,
+    # both being numpy type characters
+    return cast(str, getattr(storage, "typecode", None) or storage.format)
+
+
+def to_numpy(k: KObj) -> "npt.NDArray[Any]":
+    # view(k), except symbols become an object array of str and temporal types
+    # datetime64 or timedelta64, both copies. Temporal nulls and infinities
+    # become NaT
+    t = k.t
+    if t == TypeEnum.KS:
+        return np.array(k.context.lookup_many(k.kI()), dtype=object)
+    raw = view(k)
+    if t in _DATETIMES or t in _TIMEDELTAS:
+        return _to_temporal(raw, t)
+    return raw
+
+
+def _to_temporal(raw: "npt.NDArray[Any]", t: int) -> "npt.NDArray[Any]":
+    if t == TypeEnum.KZ:
+        # float days
+        missing = ~np.isfinite(raw)
+        ints = np.rint(np.where(missing, 0, raw) * _MS_PER_DAY).astype(np.int64)
+    else:
+        null, inf = (Nulls.j, Infs.j) if raw.itemsize == 8 else (Nulls.i, Infs.i)
+        ints = raw.astype(np.int64)
+        missing = (ints == null) | (ints == inf) | (ints == -inf)
+    if t in _DATETIMES:
+        unit = _DATETIMES[t]
+        ints += _epoch(unit)
+        out = ints.view(f"datetime64[{unit}]")
+    else:
+        out = ints.view(f"timedelta64[{_TIMEDELTAS[t]}]")
+    out[missing] = np.datetime64("NaT") if t in _DATETIMES else np.timedelta64("NaT")
+    return out
+
+
+def from_numpy(
+    a: "npt.ArrayLike",
+    t: Optional[TypeEnum] = None,
+    context: KContext = DEFAULT_CONTEXT,
+) -> KObj:
+    # a vector holding a copy of a 1 dimensional array, of type t or the type
+    # matching its dtype. Numeric and temporal arrays are copied as one buffer,
+    # datetime64 being offset to 2000.01.01 and NaT giving nulls. Arrays of str
+    # or object become symbols, interned in context. Raises OverflowError if
+    # values do not fit integer vectors, like their arrays
+    arr = np.asarray(a)
+    if arr.ndim != 1:
+        raise ValueError(
+            f"can only make vectors of 1 dimensional arrays, not {arr.ndim}"
+        )
+    if t is None:
+        t = _infer(arr.dtype)
+    if t == TypeEnum.KS:
+        return ktn(TypeEnum.KS, context=context).appendS(*arr.tolist())
+
+    v = ktn(t)
+    if t == TypeEnum.UU:
+        cast(UUIDBytesAdaptor, v.kU()).data += np.ascontiguousarray(arr, "V16").data
+        return v
+    elif t == TypeEnum.KC:
+        v.kC().data += np.ascontiguousarray(arr, "S1").data
+        return v
+    elif t in _DATETIMES or t in _TIMEDELTAS:
+        arr = _from_temporal(arr, t)
+    storage = _column_storage(v)
+    data = np.ascontiguousarray(arr, storage.typecode)
+    if data.dtype.kind in "iu" and not np.can_cast(arr.dtype, data.dtype):
+        # values that wrapped, or floats that were not whole
+        if not np.array_equal(data, arr):
+            raise OverflowError(f"{arr.dtype} values do not fit {v._tn()}")
+    storage.frombytes(data.data.cast("B"))
+    return v
+
+
+def _from_temporal(arr: "npt.NDArray[Any]", t: int) -> "npt.NDArray[Any]":
+    # integers (floats for KZ) of a vector of type t, arrays of any other dtype
+    # being taken as those already
+    if arr.dtype.kind == "M" and t in _DATETIMES:
+        unit = _DATETIMES[t]
+        ints = arr.astype(f"datetime64[{unit}]").astype(np.int64) - _epoch(unit)
+    elif arr.dtype.kind == "m" and t in _TIMEDELTAS:
+        ints = arr.astype(f"timedelta64[{_TIMEDELTAS[t]}]").astype(np.int64)
+    else:
+        return arr
+    missing = np.isnat(arr)
+    if t == TypeEnum.KZ:
+        days = ints / _MS_PER_DAY
+        days[missing] = Nulls.f
+        return days
+    ints[missing] = Nulls.j if t in (TypeEnum.KP, TypeEnum.KN) else Nulls.i
+    return ints
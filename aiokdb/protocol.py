@@ -0,0 +1,187 @@
+import logging
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+
+from aiokdb import (
+    _HEADER,
+    DEFAULT_CONTEXT,
+    BytesLike,
+    KObj,
+    MessageType,
+    _d9_payload,
+    logger,
+)
+from aiokdb.context import KContext
+
+# a KContext shared by every message, or a factory called for each message
+KContextScope = Union[KContext, Callable[[], KContext]]
+
+# receive space is offered to the transport in at least this size
+_CHUNK = 65536
+
+
+class KdbDecoder:
+    """Incremental decoder of a stream of IPC messages, free of any I/O.
+
+    Bytes arrive either through feed(), or are written in place by a transport
+    using get_buffer() and buffer_updated(), as an asyncio.BufferedProtocol does.
+    Both return the (msgtype, KObj) messages completed by the new bytes, in order.
+    Once a header is seen space for the whole message is reserved, so large
+    messages are received into a single buffer and decoded where they land.
+
+    Symbols are interned in kcontext, by default the global DEFAULT_CONTEXT. Pass a
+    KContext of its own to scope symbols to this stream, or a factory such as the
+    KContext class itself to give each message a fresh context."""
+
+    def __init__(
+        self, lazy: bool = False, kcontext: Optional[KContextScope] = None
+    ) -> None:
+        self.lazy = lazy
+        self.kcontext = DEFAULT_CONTEXT if kcontext is None else kcontext
+        self._buf = bytearray()
+        self._start = 0  # first byte of the message being received
+        self._end = 0  # bytes of _buf filled so far
+        # header fields of the message at _start, once read
+        self._msgtype = 0
+        self._flags = 0
+        self._msglen = 0
+        # raised by the next call, having returned the messages before it
+        self._error: Optional[Exception] = None
+
+    @property
+    def needed(self) -> int:
+        # bytes still to arrive before the next message can be decoded
+        have = self._end - self._start
+        if self._msglen:
+            return self._msglen - have
+        return 8 - have if have < 8 else 0
+
+    @property
+    def ready(self) -> bool:
+        # a message or error can be returned without more bytes arriving, by
+        # passing an empty buffer to feed() or feed_frames()
+        return self._error is not None or self.needed == 0
+
+    def next_kcontext(self) -> KContext:
+        # the context to decode the next message into
+        if isinstance(self.kcontext, KContext):
+            return self.kcontext
+        return self.kcontext()
+
+    @property
+    def pending(self) -> bytes:
+        # any partially received message, to report an unexpected end of stream
+        return bytes(self._buf[self._start : self._end])
+
+    def feed(self, data: BytesLike) -> List[Tuple[MessageType, KObj]]:
+        n = len(data)
+        with self.get_buffer(n) as view:
+            view[:n] = data
+        return self.buffer_updated(n)
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        # the transport releases the previous view before asking for another, so
+        # this is the only place the buffer may be resized
+        if self._start:
+            # drop decoded messages, moving any partial one to the front
+            del self._buf[: self._start]
+            self._end -= self._start
+            self._start = 0
+        size = self._end + max(sizehint, self.needed, _CHUNK)
+        if len(self._buf) < size:
+            self._buf += bytes(size - len(self._buf))
+        elif len(self._buf) > 2 * size:
+            # give back the space reserved for an earlier large message
+            del self._buf[size:]
+        return memoryview(self._buf)[self._end :]
+
+    def buffer_updated(self, nbytes: int) -> List[Tuple[MessageType, KObj]]:
+        self._end += nbytes
+        self._raise_error()
+        messages: List[Tuple[MessageType, KObj]] = []
+        try:
+            for msgtype, flags, start, end in self._frames():
+                messages.append((MessageType(msgtype), self._decode(flags, start, end)))
+        except Exception as e:
+            self._defer_error(e, messages)
+        return messages
+
+    def _decode(self, flags: int, start: int, end: int) -> KObj:
+        # decode the message at start:end of the buffer
+        data: BytesLike = self._buf
+        if self.lazy:
+            # lazily decoded lists hold on to their buffer, give them a copy
+            data = bytes(data[start:end])
+            start, end = 0, end - start
+        if end - start < 1000 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"> recv buffer={bytes(data[start:end])!r}")
+        return _d9_payload(data, start + 8, end, flags, self.lazy, self.next_kcontext())
+
+    def _defer_error(self, e: Exception, messages: List[Any]) -> None:
+        # a message failed to decode, it having been consumed. Those before it
+        # are returned first, and the error raised by the next call, so that
+        # none are lost and replies stay in order
+        if not messages:
+            raise e
+        self._error = e
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            e, self._error = self._error, None
+            raise e
+
+    def feed_frames(
+        self, data: BytesLike, inline_below: int = 0
+    ) -> List[Tuple[MessageType, int, Union[bytes, KObj]]]:
+        n = len(data)
+        with self.get_buffer(n) as view:
+            view[:n] = data
+        return self.frames_updated(n, inline_below)
+
+    def frames_updated(
+        self, nbytes: int, inline_below: int = 0
+    ) -> List[Tuple[MessageType, int, Union[bytes, KObj]]]:
+        # as buffer_updated, but returning (msgtype, flags, payload) with the
+        # payload copied out undecoded, to be decoded elsewhere by _d9_payload.
+        # Messages shorter than inline_below bytes are decoded here in place as
+        # buffer_updated would, the KObj being returned instead of the payload
+        self._end += nbytes
+        self._raise_error()
+        frames: List[Tuple[MessageType, int, Union[bytes, KObj]]] = []
+        try:
+            for msgtype, flags, start, end in self._frames():
+                payload: Union[bytes, KObj]
+                if end - start < inline_below:
+                    payload = self._decode(flags, start, end)
+                else:
+                    payload = bytes(self._buf[start + 8 : end])
+                frames.append((MessageType(msgtype), flags, payload))
+        except Exception as e:
+            self._defer_error(e, frames)
+        return frames
+
+    def _frames(self) -> Iterator[Tuple[int, int, int, int]]:
+        # (msgtype, flags, start, end) of each complete message in the buffer
+        while True:
+            have = self._end - self._start
+            if not self._msglen:
+                if have < 8:
+                    return
+                ver, msgtype, flags, msglen = _HEADER.unpack_from(
+                    self._buf, self._start
+                )
+                if msglen < 8:
+                    raise ValueError(f"message length {msglen} is shorter than header")
+                logger.debug(
+                    f"> recv ver={ver} msgtype={msgtype} flags={flags} msglen={msglen}"
+                )
+                self._msgtype, self._flags, self._msglen = msgtype, flags, msglen
+            if have < self._msglen:
+                return
+
+            # consume the message before decoding, so one that fails to decode
+            # does not stop those following it
+            start = self._start
+            end = start + self._msglen
+            self._start = end
+            self._msglen = 0
+            yield self._msgtype, self._flags, start, end
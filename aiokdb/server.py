@@ -1,13 +1,42 @@
 import asyncio
+import collections
+import concurrent.futures
 import hmac
+import ipaddress
 import itertools
 import logging
 import os
-import struct
 from functools import partial
-from typing import Any, Callable, List, Optional, Tuple
-
-from aiokdb import KException, KObj, MessageType, TypeEnum, b9, d9, krr, logger
+from typing import Any, Callable, Deque, List, Optional, Tuple, Union
+
+from aiokdb import (
+    _HEADER,
+    KException,
+    KObj,
+    MessageType,
+    TypeEnum,
+    _d9_payload,
+    b9,
+    b9_chunks,
+    krr,
+    logger,
+)
+from aiokdb.compress import CompressionPolicy, decompress
+from aiokdb.protocol import KContextScope, KdbDecoder
+
+# bytes requested per read from the stream, more if a message still needs them
+_READ_CHUNK = 65536
+
+
+def _is_loopback(host: str) -> bool:
+    # dual stack sockets give IPv4 peers as IPv4-mapped IPv6, eg. ::ffff:127.0.0.1
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+        return address.ipv4_mapped.is_loopback
+    return address.is_loopback
 
 
 class CredentialsException(Exception):
@@ -33,22 +62,70 @@ OptKcb = Optional[Callable[[KObj], None]]
 
 
 class KdbReader:
-    def __init__(self, reader: asyncio.StreamReader, raise_krr: bool = True):
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        raise_krr: bool = True,
+        executor: Optional[concurrent.futures.Executor] = None,
+        offload_threshold: int = 1 << 20,
+        kcontext: Optional[KContextScope] = None,
+    ):
+        # messages of at least offload_threshold bytes are decoded in the executor,
+        # or with a process pool, only decompressed there and decoded here.
+        # Symbols are interned in kcontext, see KdbDecoder
         self.reader = reader
         self.raise_krr = raise_krr
+        self.executor = executor
+        self.offload_threshold = offload_threshold
+        self.decoder = KdbDecoder(kcontext=kcontext)
+        self._messages: Deque[Tuple[MessageType, KObj]] = collections.deque()
+        self._frames: Deque[Tuple[MessageType, int, Union[bytes, KObj]]] = (
+            collections.deque()
+        )
 
     async def _read(self) -> Tuple[MessageType, KObj]:
-        msgh = await self.reader.readexactly(8)
-        ver, msgtype, flags, msglen = struct.unpack("<BBHI", msgh)
-        logger.debug(
-            f"> recv ver={ver} msgtype={msgtype} flags={flags} msglen={msglen}"
+        if self.executor is not None:
+            return await self._read_offload()
+        # a single read can complete several messages, queue the extras
+        while not self._messages:
+            chunk = b"" if self.decoder.ready else await self._read_chunk()
+            self._messages.extend(self.decoder.feed(chunk))
+        return self._messages.popleft()
+
+    async def _read_offload(self) -> Tuple[MessageType, KObj]:
+        # messages under the threshold are decoded in place by the decoder,
+        # only those for the executor are copied out
+        while not self._frames:
+            chunk = b"" if self.decoder.ready else await self._read_chunk()
+            frames = self.decoder.feed_frames(chunk, self.offload_threshold)
+            self._frames.extend(frames)
+        msgtype, flags, payload = self._frames.popleft()
+        if isinstance(payload, KObj):
+            return msgtype, payload
+
+        kcontext = self.decoder.next_kcontext()
+        loop = asyncio.get_running_loop()
+        if isinstance(self.executor, concurrent.futures.ProcessPoolExecutor):
+            # KObj does not cross processes, the symbols belong to our KContext
+            if flags == 1:
+                payload = await loop.run_in_executor(self.executor, decompress, payload)
+                flags = 0
+            return msgtype, _d9_payload(
+                payload, 0, len(payload), flags, False, kcontext
+            )
+        k = await loop.run_in_executor(
+            self.executor, _d9_payload, payload, 0, len(payload), flags, False, kcontext
         )
-        payload = await self.reader.readexactly(msglen - 8)
-        if len(payload) < 1000 and logging.getLogger().isEnabledFor(logging.DEBUG):
-            logger.debug(f"> recv buffer={msgh + payload!r}")
-        k = d9(msgh + payload)
         return msgtype, k
 
+    async def _read_chunk(self) -> bytes:
+        needed = self.decoder.needed
+        chunk = await self.reader.read(max(needed, _READ_CHUNK))
+        if not chunk:
+            received = self.decoder.pending
+            raise asyncio.IncompleteReadError(received, len(received) + needed)
+        return chunk
+
     async def read(self) -> Tuple[MessageType, KObj]:
         msgtype, k = await self._read()
         if self.raise_krr and k.t == TypeEnum.KRR:
@@ -64,19 +141,59 @@ class KdbWriter:
         version: int = 0,
         qid: Any = None,
         context: Optional["BaseContext"] = None,
+        compression: Optional[CompressionPolicy] = None,
     ):
         self.writer = writer
         self.qid = qid
         self.version = version
         self.reader = kreader
+        self.compression = compression
         self._context = context
         self._reader_task: Optional[asyncio.Task[None]] = None
         self._completions: List[asyncio.Future[KObj]] = []
+        self._local_peer: Optional[bool] = None
 
-    def write(self, obj: KObj, mt: MessageType = MessageType.SYNC) -> None:
-        bs = b9(obj, msgtype=mt)
-        logger.debug(f"< sending {bs!r}")
-        self.writer.write(bs)
+    def _compressing(self) -> bool:
+        # kdb+ only accepts compressed messages from peers of capability 1 or more
+        if self.compression is None or self.version < 1:
+            return False
+        if self._local_peer is None:
+            peer = self.writer.get_extra_info("peername")
+            if isinstance(peer, tuple):
+                self._local_peer = _is_loopback(peer[0])
+            else:
+                # unix domain socket
+                self._local_peer = True
+        return self.compression.localhost or not self._local_peer
+
+    def write(
+        self, obj: KObj, mt: MessageType = MessageType.SYNC, stream: bool = False
+    ) -> None:
+        # the message is encoded to a copy, unless stream=True when large vectors
+        # go to the transport as views of their own storage. These must then not
+        # be modified or resized until after `await drain()`
+        chunks = b9_chunks(obj, msgtype=mt) if stream else [b9(obj, msgtype=mt)]
+        if self.compression is not None and self._compressing():
+            if sum(map(len, chunks)) > self.compression.threshold:
+                payload = self.compression.compress(b"".join(chunks)[8:])
+                if payload is not None:
+                    chunks = [_HEADER.pack(1, mt, 1, 8 + len(payload)), payload]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"< sending {b''.join(chunks)!r}")
+        self.writer.writelines(chunks)
+
+    async def drain(self) -> None:
+        # wait until the transport has sent everything written, after which
+        # objects written with stream=True may be changed. The write buffer limits
+        # are dropped to zero meanwhile, as drain() otherwise only waits for the
+        # buffer to fall below its high water mark
+        transport = self.writer.transport
+        low, high = transport.get_write_buffer_limits()
+        transport.set_write_buffer_limits(0)
+        try:
+            await self.writer.drain()
+        finally:
+            transport.set_write_buffer_limits(high, low)
 
     async def sync_req(self, obj: KObj, ooob: OptKcb = None) -> KObj:
         # responses arrive in the order that requests are sent.
@@ -178,9 +295,22 @@ class BaseContext:
 
 class ServerContext(BaseContext):
     # TODO: wrap clients in a class for timers/callbacks?
+    # applied to every accepted connection, here for subclasses not calling __init__
+    compression: Optional[CompressionPolicy] = None
+    executor: Optional[concurrent.futures.Executor] = None
+    kcontext: Optional[KContextScope] = None
 
-    def __init__(self, password: Optional[str] = None):
+    def __init__(
+        self,
+        password: Optional[str] = None,
+        compression: Optional[CompressionPolicy] = None,
+        executor: Optional[concurrent.futures.Executor] = None,
+        kcontext: Optional[KContextScope] = None,
+    ):
         self.password = password
+        self.compression = compression
+        self.executor = executor
+        self.kcontext = kcontext
 
     def check_login(self, user: str, password: Optional[str]) -> bool:  # .z.pw
         if self.password is None:
@@ -228,8 +358,15 @@ async def process_login(
     writer.write(b"\x03")
     await writer.drain()
 
-    q_reader = KdbReader(reader)
-    q_writer = KdbWriter(writer, q_reader, version=ver, qid=qid, context=context)
+    q_reader = KdbReader(reader, executor=context.executor, kcontext=context.kcontext)
+    q_writer = KdbWriter(
+        writer,
+        q_reader,
+        version=ver,
+        qid=qid,
+        context=context,
+        compression=context.compression,
+    )
     return q_reader, q_writer
 
 
@@ -1,35 +1,56 @@
+import collections
 import logging
 import socket
 import struct
-from typing import Optional
+from typing import Deque, Optional, Tuple
 
-from aiokdb import KException, KObj, MessageType, TypeEnum, b9, cv, d9
+from aiokdb import KException, KObj, MessageType, TypeEnum, b9, cv
+from aiokdb.protocol import KContextScope, KdbDecoder
 
 
 # I don't recommend using, the asyncio interface is way nicer
 class KSocket:
-    def __init__(self, skt: socket.socket, raise_krr: bool = True):
+    def __init__(
+        self,
+        skt: socket.socket,
+        raise_krr: bool = True,
+        kcontext: Optional[KContextScope] = None,
+    ):
         self.s = skt
         self.raise_krr = raise_krr
+        self.decoder = KdbDecoder(kcontext=kcontext)
+        self._messages: Deque[Tuple[MessageType, KObj]] = collections.deque()
 
     def k(self, cmd: str, data: Optional[KObj] = None) -> KObj:
         ko = cv(cmd)
         self.s.sendall(b9(ko, msgtype=MessageType.SYNC))
-        msgh = self.readexactly(8)
-        ver, msgtype, flags, msglen = struct.unpack("<BBHI", msgh)
-        print(f"> recv ver={ver} msgtype={msgtype} flags={flags} msglen={msglen}")
-        payload = self.readexactly(msglen - 8)
+        while not self._messages:
+            if self.decoder.ready:
+                # a message or error left from the last read
+                self._messages.extend(self.decoder.feed(b""))
+                continue
+            # receive straight into the decoder's buffer
+            with self.decoder.get_buffer() as view:
+                n = self.s.recv_into(view)
+            if n == 0:
+                raise ConnectionError("connection closed mid message")
+            self._messages.extend(self.decoder.buffer_updated(n))
 
-        k = d9(msgh + payload)
+        msgtype, k = self._messages.popleft()
         if self.raise_krr and k.t == TypeEnum.KRR:
             raise KException(k.aS())
         return k
 
     def readexactly(self, sz: int) -> bytes:
-        bs = b""
-        while len(bs) < sz:
-            bs = bs + self.s.recv(sz - len(bs))
-        return bs
+        bs = bytearray(sz)
+        with memoryview(bs) as view:
+            pos = 0
+            while pos < sz:
+                n = self.s.recv_into(view[pos:])
+                if n == 0:
+                    raise ConnectionError("connection closed mid message")
+                pos += n
+        return bytes(bs)
 
 
 def khpu(
@@ -0,0 +1,43 @@
+import json
+import pathlib
+
+import pytest
+
+from aiokdb import VECTOR_CONSTUCTORS, TypeEnum
+from aiokdb.bench.compress import main as bench_compress
+from aiokdb.bench.serialize import main as bench_serialize
+
+
+def test_bench_compress(capsys: pytest.CaptureFixture[str]) -> None:
+    bench_compress(["--elements", "2000", "--repeat", "1"])
+    report = json.loads(capsys.readouterr().out)
+    results = {r["payload"]: r for r in report["results"]}
+    assert results["floats_random"]["compressed_bytes"] is None
+    assert results["floats_random"]["decompress_mb_s"] is None
+    assert results["captured_500#0j"]["bytes"] == 4006
+    assert results["longs_zero"]["ratio"] < 0.1
+    assert all(r["compress_mb_s"] > 0 for r in results.values())
+
+
+def test_bench_serialize(
+    capsys: pytest.CaptureFixture[str], tmp_path: pathlib.Path
+) -> None:
+    baseline = str(tmp_path / "baseline.json")
+    argv = ["--sizes", "10,100", "--repeat", "1"]
+    assert bench_serialize(argv + ["--save", baseline]) == 0
+    report = json.loads(capsys.readouterr().out)
+    results = {(r["case"], r["size"]): r for r in report["results"]}
+    for t in VECTOR_CONSTUCTORS:
+        if t != TypeEnum.K:
+            assert results[(t.name, 100)]["elements"] == 100
+    assert results[("table_long", 10)]["elements"] == 50
+    assert results[("mixed_list", 100)]["decode_retained_blocks"] > 100
+    assert all(r["encode_ns"] > 0 and r["decode_ns"] > 0 for r in results.values())
+
+    # an impossibly tight tolerance reports everything slower as regressed
+    argv += ["--cases", "KJ", "--baseline", baseline, "--tolerance", "-1"]
+    assert bench_serialize(argv) == 1
+    report = json.loads(capsys.readouterr().out)
+    assert len(report["results"]) == 2
+    assert len(report["baseline"]["regressions"]) == 4
+    assert "decode_ns_vs_baseline" in report["results"][0]
@@ -1,16 +1,24 @@
 import asyncio
+import os
 from typing import List, Optional
 
 import pytest
 
-from aiokdb import KException, KObj, MessageType, TypeEnum, cv, kj, kNil
+from aiokdb import KException, KObj, MessageType, TypeEnum, b9, cv, d9, kj, kNil
 from aiokdb.client import mask_uri, open_qipc_connection
-from aiokdb.extras import MagicClientContext, MagicServerContext, _string_to_functional
+from aiokdb.compress import CompressionPolicy
+from aiokdb.extras import (
+    MagicClientContext,
+    MagicServerContext,
+    _string_to_functional,
+    ktni,
+)
 from aiokdb.server import (
     CredentialsException,
     KdbWriter,
     ReentrantRequestError,
     ServerContext,
+    _is_loopback,
     start_qserver,
 )
 
@@ -143,6 +151,96 @@ async def test_server_async() -> None:
     await server.wait_closed()
 
 
+@pytest.mark.asyncio
+async def test_server_compression() -> None:
+    class EchoServerContext(ServerContext):
+        async def on_sync_request(self, cmd: KObj, dotzw: KdbWriter) -> KObj:
+            return cmd
+
+    big = ktni(TypeEnum.KJ, *([12848484] * 5000))
+    # loopback peers are left uncompressed unless asked
+    for policy, compressed in [
+        (CompressionPolicy(), 0),
+        (CompressionPolicy(localhost=True), 1),
+    ]:
+        context = EchoServerContext(compression=policy)
+        server = await start_qserver(6778, context)
+        client_rd, client_wr = await open_qipc_connection(port=6778)
+        assert (await client_wr.sync_req(big)) == big
+        assert (await client_wr.sync_req(cv("small"))).aS() == "small"
+        assert policy.compressed == compressed
+        client_wr.close()
+        await client_wr.wait_closed()
+        server.close()
+        await server.wait_closed()
+
+    assert 0 < policy.ratio < 0.1
+    assert policy.bytes_in == len(b9(big)) - 8 and policy.seconds > 0
+
+    # nor is anything compressed for clients logging in without a capability
+    server = await start_qserver(6778, EchoServerContext(compression=policy))
+    reader, writer = await asyncio.open_connection("127.0.0.1", 6778)
+    writer.write(b"user\x00")
+    assert await reader.readexactly(1) == b"\x03"
+    writer.write(b9(big, msgtype=MessageType.SYNC))
+    header = await reader.readexactly(8)
+    assert header[2] == 0 and header[1] == MessageType.RESPONSE
+    assert d9(header + await reader.readexactly(len(b9(big)) - 8)) == big
+    writer.close()
+    await writer.wait_closed()
+    server.close()
+    await server.wait_closed()
+
+    # random data is sent as is
+    client = CompressionPolicy(localhost=True)
+    server = await start_qserver(6778, EchoServerContext())
+    client_rd, client_wr = await open_qipc_connection(port=6778, compression=client)
+    noise = ktni(TypeEnum.KG, *os.urandom(3000))
+    assert (await client_wr.sync_req(noise)) == noise
+    assert (client.compressed, client.incompressible, client.ratio) == (0, 1, 1.0)
+    client_wr.close()
+    await client_wr.wait_closed()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_client_write_copies() -> None:
+    class EchoServerContext(ServerContext):
+        async def on_sync_request(self, cmd: KObj, dotzw: KdbWriter) -> KObj:
+            return cmd
+
+    server = await start_qserver(6778, EchoServerContext())
+    client_rd, client_wr = await open_qipc_connection(port=6778)
+
+    # written objects can be changed at once, large vectors included
+    big = ktni(TypeEnum.KJ, *range(20000))
+    client_wr.write(big)
+    big.kJ().append(1)
+    msgtype, k = await client_rd.read()
+    assert msgtype == MessageType.RESPONSE and len(k) == 20000
+
+    # unless streamed, when they must wait for drain()
+    client_wr.write(big, stream=True)
+    await client_wr.drain()
+    big.kJ().append(2)
+    msgtype, k = await client_rd.read()
+    assert len(k) == 20001 and list(k.kJ()[-2:]) == [19999, 1]
+
+    client_wr.close()
+    await client_wr.wait_closed()
+    server.close()
+    await server.wait_closed()
+
+
+def test_loopback_peers() -> None:
+    # as compression policies see them, including IPv4 on dual stack sockets
+    for host in ["127.0.0.1", "::1", "::ffff:127.0.0.1"]:
+        assert _is_loopback(host)
+    for host in ["10.0.0.1", "::ffff:10.0.0.1", "2001:db8::1", "fe80::1%eth0"]:
+        assert not _is_loopback(host)
+
+
 def test_extras_parse_commands() -> None:
     with pytest.raises(ValueError):
         _string_to_functional(kj(4))
@@ -1,6 +1,13 @@
+import array
+import concurrent.futures
+import threading
+
 import pytest
 
+from aiokdb import TypeEnum, b9, d9, kk, ks, ktn, xd
 from aiokdb.context import KContext
+from aiokdb.extras import ktns
+from aiokdb.protocol import KdbDecoder
 
 
 def test_context() -> None:
@@ -20,3 +27,138 @@ def test_context() -> None:
     with pytest.raises(TypeError):
         kcon.ss(6)  # type: ignore[arg-type]
     assert len(kcon.symbols) == len(kcon._symbol_bytes)
+
+
+def test_context_bytes_many() -> None:
+    kcon = KContext()
+    assert kcon.ss("a") == 0
+    idxs = kcon.ss_bytes_many([b"b", b"a", "💩".encode(), b"b", b""])
+    assert list(idxs) == [1, 0, 2, 1, 3]
+    assert kcon.lookup_str(2) == "💩"
+    assert kcon.lookup_bytes(3) == b"\00"
+    assert kcon.ss("") == 3
+    assert len(kcon.symbols) == len(kcon._symbol_raw) == 4
+
+
+def test_context_threads() -> None:
+    # symbols added concurrently keep one index each, consistent across lookups
+    kcon = KContext()
+    names = [f"s{i}" for i in range(2000)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda n: [kcon.ss(s) for s in n], [names] * 4))
+    assert results[0] == results[1] == results[2] == results[3]
+    assert sorted(results[0]) == list(range(2000))
+    assert [kcon.lookup_str(i) for i in results[0]] == names
+
+    # batches of known symbols do not wait for the lock unless reclaiming
+    held, release = threading.Event(), threading.Event()
+
+    def hold() -> None:
+        with kcon._lock:
+            held.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait()
+    try:
+        assert list(kcon.ss_many(names[:3])) == results[0][:3]
+        assert list(kcon.ss_bytes_many([b"s0"])) == results[0][:1]
+    finally:
+        release.set()
+        holder.join()
+
+
+def test_context_stats_and_reclaim() -> None:
+    kcon = KContext(max_age=2)
+    assert list(kcon.ss_bytes_many([b"a", b"b", b"a"])) == [0, 1, 0]
+    assert kcon.ss("a") == 0
+    assert kcon.stats() == {
+        "size": 2,
+        "capacity": 2,
+        "free": 0,
+        "generation": 0,
+        "hits": 2,
+        "misses": 2,
+        "hit_rate": 0.5,
+    }
+
+    # b is not seen again so is swept at the end of the second generation
+    assert kcon.advance() == 0
+    assert kcon.ss_bytes(b"a") == 0
+    assert kcon.advance() == 0
+    kcon.ss("a")
+    assert kcon.advance() == 0
+    assert kcon.advance() == 1
+    assert len(kcon) == 1 and "b" not in kcon.symbols
+    assert kcon.ss_bytes(b"a") == 0
+
+    # its index is reused
+    assert kcon.ss("c") == 1
+    assert kcon.lookup_bytes(1) == b"c\x00"
+    assert kcon.ss_bytes(b"c") == 1 and kcon.stats()["free"] == 0
+
+    with pytest.raises(ValueError):
+        KContext(max_age=0)
+
+
+def test_context_reclaim_in_use() -> None:
+    # symbols of objects still read or encoded are kept, only unused ones go
+    kcon = KContext(max_age=1)
+    held = ktn(TypeEnum.KS, context=kcon).appendS("a", "b")
+    atom = ks("c", context=kcon)
+    ks("d", context=kcon)
+    for i in range(4):
+        assert held.kS()[0] == "a" and b9(held) == b9(ktns("a", "b"))
+        assert atom.aS() == "c"
+        kcon.advance()
+    assert sorted(kcon.symbols) == ["a", "b", "c"]
+    assert kcon.ss("e") == 3 and held.kS() == ["a", "b"] and atom.aS() == "c"
+
+    # reclaiming while other threads intern and look up raises nothing
+    kcon = KContext(max_age=1)
+    names = [f"s{i}".encode() for i in range(500)]
+
+    def work(n: int) -> None:
+        for i in range(200):
+            kcon.lookup_bytes_many(kcon.ss_bytes_many(names[i : i + 50]))
+            if n == 0:
+                kcon.advance()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(work, range(4)))
+    assert len(kcon) == len(kcon._symbol_raw) == len(kcon.symbols)
+
+
+def test_context_decode() -> None:
+    msg = b9(kk(ks("x"), ktns("y", "x"), xd(ktns("z"), ktns("x"))))
+    kcon = KContext()
+    k = d9(msg, context=kcon)
+    assert list(kcon.symbols) == ["x", "y", "z"]
+    assert k.kK()[0].context is kcon and k.kK()[1].context is kcon
+    assert k.kK()[1].kS() == ["y", "x"]
+    assert k.kK()[2].kvalue().kS() == ["x"]
+    assert b9(k) == msg
+
+    lazy = d9(msg, lazy=True, context=KContext())
+    assert list(lazy.kK()[1].kS()) == ["y", "x"] and lazy == k
+
+    # a fresh context per message
+    decoder = KdbDecoder(kcontext=KContext)
+    (_, a), (_, b) = decoder.feed(msg + msg)
+    assert a.kK()[0].context is not b.kK()[0].context
+    assert a == b == k
+
+
+def test_context_many() -> None:
+    kcon = KContext()
+    assert kcon.ss("a") == 0
+    idxs = kcon.ss_many(s for s in ["b", "a", "b", "💩"])
+    assert idxs == array.array("i", [1, 0, 1, 2])
+    assert kcon.ss_many([]) == array.array("i")
+    assert kcon.lookup_many(idxs) == ["b", "a", "b", "💩"]
+    assert kcon.lookup_bytes_many(idxs) == "b\0a\0b\0💩\0".encode()
+    assert (kcon.hits, kcon.misses) == (2, 3)
+
+    with pytest.raises(TypeError):
+        kcon.ss_many(["c", 6])  # type: ignore[list-item]
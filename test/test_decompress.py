@@ -1,3 +1,6 @@
+import random
+import struct
+
 from aiokdb import d9
 from aiokdb.compress import compress, decompress
 
@@ -53,3 +56,59 @@ def test_compress() -> None:
     assert bs is not None
     ds = decompress(bs)
     assert ds == data
+
+
+def _decompress_bytewise(data: bytes) -> bytes:
+    # reference decoder, one byte and one hash update at a time
+    dst = bytearray(struct.unpack("I", data[0:4])[0] - 8)
+    hashpos = [0] * 256
+    d, s, p, f, i = 4, 0, 0, 0, 0
+    while s < len(dst):
+        if i == 0:
+            f, d, i = data[d], d + 1, 1
+        n = 0
+        if f & i:
+            r, n = hashpos[data[d]], data[d + 1]
+            for m in range(2 + n):
+                dst[s + m] = dst[r + m]
+            d, s = d + 2, s + 2
+        else:
+            dst[s] = data[d]
+            d, s = d + 1, s + 1
+        while p < s - 1:
+            hashpos[dst[p] ^ dst[p + 1]] = p
+            p += 1
+        s += n
+        if f & i:
+            p = s
+        i = (i << 1) & 255
+    return bytes(dst)
+
+
+def test_decompress_random() -> None:
+    # short repeating patterns exercise overlapping history copies
+    rng = random.Random(7)
+    checked = 0
+    for trial in range(300):
+        sz = rng.randrange(1, 3000)
+        pattern = bytes(rng.randrange(256) for i in range(rng.randrange(1, 12)))
+        data = bytearray((pattern * sz)[:sz])
+        for i in range(rng.randrange(0, sz // 4 + 1)):
+            data[rng.randrange(sz)] = rng.randrange(256)
+        bs = compress(bytes(data))
+        if bs is None:
+            continue
+        checked += 1
+        assert decompress(bs) == data == _decompress_bytewise(bs)
+    assert checked > 100
+
+
+def test_compress_sampled() -> None:
+    # large incompressible inputs are rejected from a sample, mixed ones still pass
+    rng = random.Random(11)
+    noise = bytes(rng.randrange(256) for i in range(200000))
+    assert compress(noise) is None
+    mixed = b"".join(noise[i : i + 300] + bytes(1700) for i in range(0, 100000, 300))
+    bs = compress(mixed)
+    assert bs is not None and len(bs) < len(mixed) // 4
+    assert decompress(bs) == mixed
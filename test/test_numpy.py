@@ -0,0 +1,87 @@
+from uuid import UUID
+
+import pytest
+
+from aiokdb import Infs, Nulls, TypeEnum, b9, cv, kk, ktn, xd, xt
+from aiokdb.extras import ktnb, ktnf, ktni, ktns, ktnu
+
+np = pytest.importorskip("numpy")
+knp = pytest.importorskip("aiokdb.numpy")
+
+
+def test_numpy_view() -> None:
+    v = ktni(TypeEnum.KJ, 1, 2, 3)
+    a = knp.view(v)
+    assert a.dtype == np.int64 and list(a) == [1, 2, 3]
+    # shares storage both ways
+    a[0] = 9
+    v.kJ()[2] = 7
+    assert list(v.kJ()) == [9, 2, 7] and list(a) == [9, 2, 7]
+
+    assert knp.view(ktnb(True, False)).tolist() == [True, False]
+    assert knp.view(ktnf(TypeEnum.KE, 1.5)).dtype == np.float32
+    assert knp.view(ktni(TypeEnum.KD, 1, 2)).tolist() == [1, 2]
+    assert knp.view(cv("ab")).tolist() == [b"a", b"b"]
+    assert knp.view(ktnu(UUID(int=5)))[0].tobytes() == UUID(int=5).bytes
+    assert len(knp.view(ktn(TypeEnum.KF))) == 0
+    with pytest.raises(ValueError, match="to_numpy"):
+        knp.view(ktns("a"))
+
+    # row windows of tables are views too
+    t = xt(xd(ktns("a"), kk(ktni(TypeEnum.KJ, *range(10)))))
+    assert knp.view(t[2:5]["a"]).tolist() == [2, 3, 4]
+
+
+def test_numpy_temporal() -> None:
+    p = knp.to_numpy(ktni(TypeEnum.KP, 0, 1, Nulls.j, Infs.j))
+    assert p[0] == np.datetime64("2000-01-01T00:00:00", "ns")
+    assert p[1] - p[0] == np.timedelta64(1, "ns")
+    assert np.isnat(p[2]) and np.isnat(p[3])
+
+    d = knp.to_numpy(ktni(TypeEnum.KD, 0, -1, Nulls.i))
+    assert d.tolist()[:2] == [np.datetime64("2000-01-01"), np.datetime64("1999-12-31")]
+    assert str(knp.to_numpy(ktni(TypeEnum.KM, 13))[0]) == "2001-02"
+    assert knp.to_numpy(ktni(TypeEnum.KT, 1500))[0] == np.timedelta64(1500, "ms")
+    assert knp.to_numpy(ktni(TypeEnum.KN, 5))[0] == np.timedelta64(5, "ns")
+    assert knp.to_numpy(ktns("a", "b")).tolist() == ["a", "b"]
+
+    # and back, NaT becoming null
+    dates = np.array(["2000-01-02", "NaT", "1999-12-31"], dtype="datetime64[D]")
+    assert list(knp.from_numpy(dates).kI()) == [1, Nulls.i, -1]
+    stamps = knp.from_numpy(dates.astype("datetime64[ns]"))
+    assert stamps.t == TypeEnum.KP and stamps.kJ()[0] == 86400 * 10**9
+    z = knp.from_numpy(dates, t=TypeEnum.KZ)
+    assert z.kF()[2] == -1.0
+    assert knp.to_numpy(z).astype("datetime64[D]").tolist() == dates.tolist()
+    span = np.array([1, 2], dtype="timedelta64[s]")
+    assert list(knp.from_numpy(span, t=TypeEnum.KV).kI()) == [1, 2]
+
+
+def test_numpy_from() -> None:
+    h = knp.from_numpy(np.arange(3, dtype=np.int16))
+    assert b9(h) == b9(ktni(TypeEnum.KH, 0, 1, 2))
+    assert b9(knp.from_numpy(np.array([1.5, 2.5]))) == b9(ktnf(TypeEnum.KF, 1.5, 2.5))
+    assert b9(knp.from_numpy(np.array([True, False]))) == b9(ktnb(True, False))
+    assert b9(knp.from_numpy(np.array(["x", "y"]))) == b9(ktns("x", "y"))
+    i = knp.from_numpy(np.array([1, 2]), t=TypeEnum.KI)
+    assert i.t == TypeEnum.KI and list(i.kI()) == [1, 2]
+
+    u = ktnu(UUID(int=1), UUID(int=2))
+    assert b9(knp.from_numpy(knp.view(u))) == b9(u)
+    assert knp.from_numpy(knp.view(cv("hi"))).aS() == "hi"
+    # strided arrays are gathered
+    assert list(knp.from_numpy(np.arange(10)[::3]).kJ()) == [0, 3, 6, 9]
+
+    # narrowing checks the values
+    assert list(knp.from_numpy(np.array([2.0, -1.0]), t=TypeEnum.KH).kH()) == [2, -1]
+    with pytest.raises(OverflowError, match="KI"):
+        knp.from_numpy(np.array([2**40 + 5, -1]), t=TypeEnum.KI)
+    with pytest.raises(OverflowError, match="KG"):
+        knp.from_numpy(np.array([1.9, 300.0]), t=TypeEnum.KG)
+    with pytest.raises(OverflowError):
+        knp.from_numpy(np.array([-1]), t=TypeEnum.KG)
+
+    with pytest.raises(ValueError, match="1 dimensional"):
+        knp.from_numpy(np.zeros((2, 2)))
+    with pytest.raises(ValueError, match="pass one as t"):
+        knp.from_numpy(np.zeros(2, dtype=np.uint32))
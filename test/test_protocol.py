@@ -0,0 +1,174 @@
+import asyncio
+import concurrent.futures
+import socket
+from typing import Callable
+
+import pytest
+
+from aiokdb import MessageType, TypeEnum, b9, cv, d9, kj, kk, ktn
+from aiokdb.extras import ktni
+from aiokdb.protocol import KdbDecoder
+from aiokdb.server import KdbReader
+from aiokdb.socket import KSocket
+
+# 500#12848484j as sent compressed by kdb
+COMPRESSED = bytes.fromhex(
+    "0102010052000000ae0f0000000700f4010000640dfec40000000169ffc9ffc4ff00010000ff69ffc9ffc4ff0000000169ffc9ffc4ffff0001000069ffc9ffc4ff0000000169ff1fc9ffc4ff00010000696e"
+)
+
+
+def test_decoder_feed() -> None:
+    big = ktni(TypeEnum.KJ, *range(20000))
+    stream = (
+        b9(kj(1), msgtype=MessageType.ASYNC)
+        + b9(big, msgtype=MessageType.SYNC)
+        + COMPRESSED
+        + b9(cv("last"), msgtype=MessageType.RESPONSE)
+    )
+
+    # one byte at a time, and all at once
+    decoder = KdbDecoder()
+    received = []
+    for i in range(len(stream)):
+        received.extend(decoder.feed(stream[i : i + 1]))
+        if i == 7:
+            assert decoder.needed == 9
+    assert decoder.needed == 8 and decoder.pending == b""
+    assert received == KdbDecoder().feed(stream)
+
+    assert [m for m, k in received] == [
+        MessageType.ASYNC,
+        MessageType.SYNC,
+        MessageType.RESPONSE,
+        MessageType.RESPONSE,
+    ]
+    assert received[0][1].aJ() == 1
+    assert received[1][1] == big
+    assert list(received[2][1].kJ()) == [12848484] * 500
+    assert received[3][1].aS() == "last"
+
+    # a message split mid-way stays pending
+    decoder = KdbDecoder()
+    assert decoder.feed(stream[:20]) == [(MessageType.ASYNC, kj(1))]
+    assert decoder.pending == stream[17:20]
+
+    with pytest.raises(ValueError, match="shorter than header"):
+        KdbDecoder().feed(bytes.fromhex("0100000004000000"))
+
+
+# a message of unknown type 112, which fails to decode
+BAD = bytes.fromhex("010000000a0000007000")
+
+
+def test_decoder_frames() -> None:
+    # small messages are decoded in place, only large ones copied out
+    big = ktni(TypeEnum.KJ, *range(1000))
+    decoder = KdbDecoder()
+    frames = decoder.feed_frames(b9(kj(1)) + b9(big) + b9(cv("x")), 100)
+    assert frames[0] == (MessageType.ASYNC, 0, kj(1))
+    assert frames[1] == (MessageType.ASYNC, 0, b9(big)[8:])
+    assert frames[2] == (MessageType.ASYNC, 0, cv("x"))
+
+
+def test_decoder_bad_frame() -> None:
+    # messages either side of one that fails to decode are all delivered, in
+    # order, without waiting for more bytes
+    decoder = KdbDecoder()
+    assert decoder.feed(b9(kj(1)) + BAD + b9(kj(3))) == [(MessageType.ASYNC, kj(1))]
+    assert decoder.ready
+    with pytest.raises(Exception, match="While unpacking"):
+        decoder.feed(b"")
+    assert decoder.feed(b"") == [(MessageType.ASYNC, kj(3))]
+    assert not decoder.ready
+
+    decoder = KdbDecoder()
+    frames = decoder.feed_frames(b9(kj(1)) + b9(kj(2))[:4] + bytes(4))
+    assert len(frames) == 1
+    with pytest.raises(ValueError, match="shorter than header"):
+        decoder.feed_frames(b"")
+
+
+def test_decoder_buffered_and_lazy() -> None:
+    msgs = [b9(kk(cv("a" * i), kj(i))) for i in range(200)]
+    stream = b"".join(msgs)
+
+    # as an asyncio.BufferedProtocol would, writing into offered space
+    decoder = KdbDecoder(lazy=True)
+    received = []
+    pos = 0
+    while pos < len(stream):
+        view = decoder.get_buffer(-1)
+        n = min(len(view), 37, len(stream) - pos)
+        view[:n] = stream[pos : pos + n]
+        del view
+        received.extend(decoder.buffer_updated(n))
+        pos += n
+
+    assert len(received) == 200
+    for i, (msgtype, k) in enumerate(received):
+        assert k.kK()[1].aJ() == i
+        assert b9(k) == msgs[i]
+
+
+@pytest.mark.asyncio
+async def test_kdbreader_chunks() -> None:
+    reader = asyncio.StreamReader()
+    reader.feed_data(b9(ktn(TypeEnum.KJ), msgtype=MessageType.ASYNC) + b9(kj(2))[:5])
+    kreader = KdbReader(reader)
+    msgtype, k = await kreader.read()
+    assert msgtype == MessageType.ASYNC and len(k) == 0
+
+    reader.feed_data(b9(kj(2))[5:] + b9(kj(3)))
+    reader.feed_eof()
+    assert (await kreader.read())[1].aJ() == 2
+    assert (await kreader.read())[1].aJ() == 3
+    with pytest.raises(asyncio.IncompleteReadError):
+        await kreader.read()
+
+
+@pytest.mark.asyncio
+async def test_kdbreader_bad_frame() -> None:
+    reader = asyncio.StreamReader()
+    reader.feed_data(b9(kj(1)) + BAD + b9(kj(3)))
+    reader.feed_eof()
+    kreader = KdbReader(reader)
+    assert (await kreader.read())[1].aJ() == 1
+    with pytest.raises(Exception, match="While unpacking"):
+        await kreader.read()
+    assert (await kreader.read())[1].aJ() == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "executor",
+    [concurrent.futures.ThreadPoolExecutor, concurrent.futures.ProcessPoolExecutor],
+)
+async def test_kdbreader_offload(
+    executor: Callable[..., concurrent.futures.Executor],
+) -> None:
+    big = ktni(TypeEnum.KJ, *range(1000))
+    reader = asyncio.StreamReader()
+    reader.feed_data(b9(kj(1)) + b9(big) + COMPRESSED + b9(cv("x")))
+    reader.feed_eof()
+    with executor(max_workers=1) as pool:
+        kreader = KdbReader(reader, executor=pool, offload_threshold=100)
+        received = [(await kreader.read())[1] for i in range(4)]
+    assert received[0].aJ() == 1 and received[1] == big
+    assert list(received[2].kJ()) == [12848484] * 500
+    assert received[3].aS() == "x"
+
+
+def test_ksocket() -> None:
+    ours, theirs = socket.socketpair()
+    with ours, theirs:
+        theirs.sendall(b9(kj(5), msgtype=MessageType.RESPONSE))
+        assert KSocket(ours).k("2+3").aJ() == 5
+        assert d9(theirs.recv(100)).aS() == "2+3"
+
+        # an error read along with the last reply is raised without reading more
+        ours.settimeout(5)
+        ksocket = KSocket(ours)
+        theirs.sendall(b9(kj(5), msgtype=MessageType.RESPONSE) + BAD)
+        assert ksocket.k("2+3").aJ() == 5
+        with pytest.raises(Exception, match="While unpacking"):
+            ksocket.k("2+3")